@@ -0,0 +1,60 @@
+"""
+Measures how parse time and memory grow with input size, then fuzzes the
+parser with generated expressions.
+
+    uv run python benchmarks/parser_scaling.py --max-size 3200 --iterations 2000
+
+Each scaling family is parsed at doubling sizes up to --max-size; families
+whose time or memory grows faster than linearly are flagged, and sizes that
+crash the parser are listed with their error.
+"""
+
+import argparse
+from collections import Counter
+
+from xf_lark import XFParser
+from xf_lark.fuzz import SCALING_FAMILIES, fuzz, scaling_run
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__)
+    argument_parser.add_argument("--min-size", type=int, default=50)
+    argument_parser.add_argument("--max-size", type=int, default=3200)
+    argument_parser.add_argument("--repeats", type=int, default=3)
+    argument_parser.add_argument("--iterations", type=int, default=1000)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    arguments = argument_parser.parse_args()
+
+    parser = XFParser()
+    sizes = []
+    size = arguments.min_size
+    while size <= arguments.max_size:
+        sizes.append(size)
+        size *= 2
+
+    for family in SCALING_FAMILIES:
+        report = scaling_run(parser, family, sizes, arguments.repeats)
+        flag = "  SUPER-LINEAR" if report["super_linear"] else ""
+        print(f"{family}: time ~ n^{report['time_exponent']:.2f}, "
+              f"memory ~ n^{report['memory_exponent']:.2f}{flag}")
+        for measurement in report["measurements"]:
+            if measurement["error"] is None:
+                print(f"  {measurement['size']:>9,} chars  {measurement['seconds'] * 1e3:9.2f} ms  "
+                      f"{measurement['peak_bytes'] / 2**10:9.1f} KiB")
+            else:
+                print(f"  {measurement['size']:>9,} chars  {measurement['error'][:60]}")
+
+    report = fuzz(parser, arguments.iterations, arguments.seed)
+    print(f"fuzz: {report['expressions']:,} expressions, {report['parsed']:,} parsed, "
+          f"{report['rejected']:,} rejected as expected")
+    groups: Counter[tuple[str, str]] = Counter()
+    for crash in report["crashes"]:
+        # Exceptions are grouped by type rather than by their varying messages
+        error = crash["error"] if crash["kind"] == "malformed" else crash["error"].split(":")[0]
+        groups[crash["kind"], error] += 1
+    for (kind, error), count in groups.most_common():
+        print(f"  {count:>6,} {kind}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmarks `pulldata()` lookups against a generated CSV.
+
+    uv run python benchmarks/pulldata_benchmark.py --rows 2000000 --lookups 10000
+
+Reports the one-off index build time, cold lookups (a freshly opened source
+whose index already exists on disk) and warm lookups (the same source, pages
+already mapped).
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from xf_lark import XFParser
+from xf_lark.evaluator import compile_expression
+from xf_lark.pulldata import PulldataSource
+
+
+def generate_csv(path: Path, rows: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("hh_id,head_name,village,members\n")
+        for i in range(rows):
+            f.write(f"HH{i:09d},Head of household {i},Village {i % 5000},{i % 12}\n")
+
+
+def time_lookups(source: PulldataSource, keys: list[str]) -> float:
+    expression = compile_expression(
+        XFParser().parse("pulldata('households', 'head_name', 'hh_id', ${hh_id})")
+    )
+    context = {"values": {}, "pulldata": {"households": source}}
+    start = time.perf_counter()
+    for key in keys:
+        context["values"]["hh_id"] = key
+        expression(context)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__)
+    argument_parser.add_argument("--rows", type=int, default=1_000_000)
+    argument_parser.add_argument("--lookups", type=int, default=10_000)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    arguments = argument_parser.parse_args()
+
+    rng = random.Random(arguments.seed)
+    keys = [f"HH{rng.randrange(arguments.rows):09d}" for _ in range(arguments.lookups)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = Path(directory) / "households.csv"
+        start = time.perf_counter()
+        generate_csv(csv_path, arguments.rows)
+        print(f"generated {arguments.rows:,} rows in {time.perf_counter() - start:.2f}s "
+              f"({csv_path.stat().st_size / 2**20:.1f} MiB)")
+
+        with PulldataSource(csv_path) as source:
+            start = time.perf_counter()
+            source.prepare("hh_id")
+            print(f"index build: {time.perf_counter() - start:.2f}s")
+
+        with PulldataSource(csv_path) as source:
+            cold = time_lookups(source, keys)
+            warm = time_lookups(source, keys)
+
+        for label, elapsed in (("cold", cold), ("warm", warm)):
+            print(f"{label} lookups: {arguments.lookups / elapsed:,.0f}/s "
+                  f"({elapsed / arguments.lookups * 1e6:.1f} us each)")
+
+
+if __name__ == "__main__":
+    main()
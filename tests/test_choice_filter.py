@@ -0,0 +1,89 @@
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.choice_filter import ChoiceIndex, filter_choices, plan_choice_filter
+from xf_lark.evaluator import compile_expression
+from xf_lark.functions import to_boolean
+
+parser = XFParser()
+
+choices = [
+    {"name": f"village_{i}", "district": f"d{i % 10}", "active": "yes" if i % 3 else "no", "size": str(i)}
+    for i in range(300)
+] + [
+    # Numeric cells compare as numbers, so they can't be looked up by their string
+    {"name": "numeric_3", "district": 3, "active": "yes", "size": 7.0},
+    {"name": "numeric_4", "district": 4.0, "active": "no", "size": 8.0},
+]
+
+
+def scan(expression, values):
+    predicate = compile_expression(parser.parse(expression))
+    return [row for row in choices if to_boolean(predicate({"values": values, "node": row}))]
+
+
+@pytest.mark.parametrize(
+    "expression, indexed_columns",
+    [
+        ("district=${district}", ("district",)),
+        ("district=${district} and active='yes'", ("active", "district")),
+        ("'yes' = active and district = ${district}", ("active", "district")),
+        ("district=${district} and size > 100", ("district",)),
+        ("district=${district} or active='yes'", ()),
+        ("size > 100", ()),
+        ("district = name", ()),
+    ],
+)
+def test_plan(expression, indexed_columns):
+    plan = plan_choice_filter(parser.parse(expression))
+    assert plan.columns == indexed_columns
+    assert plan.is_indexed == bool(indexed_columns)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "district=${district}",
+        "district=${district} and active='yes'",
+        "district=${district} and size > 100",
+        "district=${district} or active='yes'",
+        "active = 'yes' and size < 20",
+        "district = ${districts}",
+        "size = ${size}",
+        "district = ${missing}",
+        "district = ${code}",
+        "district = ${code} and active = 'yes'",
+        "district = ${padded}",
+        "size = ${count} and district = ${code}",
+    ],
+)
+def test_results_match_full_scan(expression):
+    values = {
+        "district": "d3",
+        "districts": ["d1", "d2"],
+        "size": 42.0,
+        "code": "3.0",
+        "padded": "03",
+        "count": "7",
+    }
+    index = ChoiceIndex(choices)
+    plan = plan_choice_filter(parser.parse(expression))
+    assert index.filter(plan, {"values": values}) == scan(expression, values)
+
+
+def test_index_is_built_once():
+    index = ChoiceIndex(choices)
+    plan = plan_choice_filter(parser.parse("district=${district}"))
+    index.filter(plan, {"values": {"district": "d1"}})
+    built = index.index_on(("district",))
+    index.filter(plan, {"values": {"district": "d2"}})
+    assert index.index_on(("district",)) is built
+
+
+def test_filter_choices():
+    result = filter_choices(
+        parser.parse("district=${district} and active='no'"),
+        choices,
+        {"values": {"district": "d0"}},
+    )
+    assert [row["name"] for row in result][:3] == ["village_0", "village_30", "village_60"]
@@ -0,0 +1,98 @@
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.corpus import CorpusStore
+
+parser = XFParser()
+
+HOUSEHOLD = {
+    "consent.relevant": "${age} >= 18",
+    "name.relevant": "${consent} = 'yes'",
+    "income.calculation": "pulldata('rates', 'rate', 'region', ${region}) * ${amount}",
+}
+CLINIC = {
+    "visit.relevant": "${consent} = 'yes' and selected(${services}, 'visit')",
+    "bmi.calculation": "${weight} div (${height} * ${height})",
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with CorpusStore(tmp_path / "corpus.sqlite") as store:
+        store.put_form("household", HOUSEHOLD)
+        store.put_form("clinic", CLINIC)
+        yield store
+
+
+def keys(matches):
+    return [(match["form"], match["expression"]) for match in matches]
+
+
+def test_find_variable(store):
+    assert keys(store.find_variable("consent")) == [
+        ("clinic", "visit.relevant"),
+        ("household", "name.relevant"),
+    ]
+    assert store.find_variable("missing") == []
+
+
+def test_find_function_and_operator(store):
+    assert keys(store.find_function("pulldata")) == [("household", "income.calculation")]
+    assert keys(store.find_operator("divide")) == [("clinic", "bmi.calculation")]
+    assert keys(store.find_operator("eq")) == [
+        ("clinic", "visit.relevant"),
+        ("household", "name.relevant"),
+    ]
+
+
+def test_match_includes_source(store):
+    (match,) = store.find_function("selected")
+    assert match["source"] == CLINIC["visit.relevant"]
+
+
+def test_get_ast(store):
+    assert store.get_ast("clinic", "bmi.calculation") == parser.parse(
+        CLINIC["bmi.calculation"]
+    )
+    with pytest.raises(KeyError):
+        store.get_ast("clinic", "missing")
+
+
+def test_replace_form(store):
+    store.put_form(
+        "household",
+        {
+            "consent.relevant": "${age}>=18",
+            "name.relevant": "${agreed} = 'yes'",
+            "hhsize.constraint": ". > 0",
+        },
+    )
+    assert keys(store.find_variable("consent")) == [("clinic", "visit.relevant")]
+    assert keys(store.find_variable("agreed")) == [("household", "name.relevant")]
+    assert keys(store.find_variable("age")) == [("household", "consent.relevant")]
+    assert store.find_function("pulldata") == []
+    assert keys(store.find_operator("gt")) == [("household", "hhsize.constraint")]
+    (match,) = store.find_variable("age")
+    assert match["source"] == "${age}>=18"
+
+
+def test_failed_replace_leaves_form_untouched(store):
+    with pytest.raises(Exception):
+        store.put_form("household", {"name.relevant": "${consent} ="})
+    assert keys(store.find_function("pulldata")) == [("household", "income.calculation")]
+
+
+def test_remove_form(store):
+    store.remove_form("household")
+    assert store.forms() == ["clinic"]
+    assert keys(store.find_variable("consent")) == [("clinic", "visit.relevant")]
+    assert store.find_function("pulldata") == []
+
+
+def test_store_persists(tmp_path):
+    path = tmp_path / "corpus.sqlite"
+    with CorpusStore(path) as store:
+        store.put_form("clinic", CLINIC)
+    with CorpusStore(path) as store:
+        assert store.forms() == ["clinic"]
+        assert len(store.find_variable("height")) == 1
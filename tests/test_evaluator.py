@@ -0,0 +1,204 @@
+import datetime
+import math
+
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.evaluator import compile_expression, evaluate
+from xf_lark.functions import (
+    FUNCTIONS,
+    compile_date_format,
+    compile_regex,
+    to_number,
+    to_string,
+)
+from xf_lark.type_inference import FUNCTION_SIGNATURES
+
+parser = XFParser()
+
+
+def run(expression, **context):
+    return evaluate(parser.parse(expression), context)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("1 + 2 * 3", 7.0),
+        ("10 div 4", 2.5),
+        ("7 mod 3", 1.0),
+        ("-7 mod 3", -1.0),
+        ("5.5 mod -2", 1.5),
+        ("2 + 7 mod 3 * 2", 4.0),
+        ("-(1 + 2)", -3.0),
+        ("'3' + 1", 4.0),
+        ("1 = 1 and 2 > 1", True),
+        ("1 = 2 or 'a' = 'b'", False),
+        ("concat('a', 1, true())", "a1true"),
+        ("if(1 > 2, 'yes', 'no')", "no"),
+        ("round(2.5)", 3.0),
+        ("round(1.005, 2)", 1.01),
+        ("int(-2.7)", -2.0),
+        ("substr('hello', 1, 3)", "el"),
+        ("substring-before('a-b', '-')", "a"),
+        ("substring-after('a-b', '-')", "b"),
+        ("translate('abc', 'ab', 'A')", "Ac"),
+        ("normalize-space('  a   b ')", "a b"),
+        ("string-length('abc')", 3.0),
+        ("count-selected('a b c')", 3.0),
+        ("selected('a b c', 'b')", True),
+        ("selected-at('a b c', 2)", "c"),
+        ("regex('12345', '^\\d{5}$')", True),
+        ("contains('hello', 'ell')", True),
+        ("starts-with('hello', 'he')", True),
+        ("ends-with('hello', 'lo')", True),
+        ("boolean-from-string('1')", True),
+        ("max(1, 5, 3)", 5.0),
+        ("coalesce('', 'fallback')", "fallback"),
+        ("format-date('2024-03-05', '%Y/%n/%e %b')", "2024/3/5 Mar"),
+        ("decimal-time('12:00:00')", 0.5),
+        ("date('2024-01-02') - date('2024-01-01')", 1.0),
+    ],
+)
+def test_literal_expressions(expression, expected):
+    assert run(expression) == expected
+
+
+def test_division_by_zero():
+    assert run("1 div 0") == math.inf
+    assert math.isnan(run("0 div 0"))
+    assert math.isnan(run("1 mod 0"))
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("round(1.5, 1 div 0)", 1.5),
+        ("round(1.5, -1 div 0)", 0.0),
+        ("substr('abc', 1 div 0)", ""),
+        ("substr('abc', -1 div 0, 2)", "ab"),
+        ("uuid(1 div 0)", ""),
+        ("date(1e10)", ""),
+        ("format-date(1e10, '%Y')", ""),
+        ("pow(2, 1e6)", math.inf),
+        ("pow(0, -1)", math.inf),
+        ("exp(1000)", math.inf),
+        ("exp10(400)", math.inf),
+        ("log(0)", -math.inf),
+    ],
+)
+def test_out_of_range_arguments(expression, expected):
+    assert run(expression) == expected
+
+
+def test_undefined_results_are_nan():
+    assert math.isnan(run("decimal-date-time(1e12)"))
+    assert math.isnan(run("pow(-8, 0.5)"))
+
+
+def test_references():
+    context = {
+        "values": {"age": "21", "name": "Ada"},
+        "node": {"district": "north"},
+        "current": "7",
+    }
+    assert run("${age} >= 18", **context) is True
+    assert run("district = 'north'", **context) is True
+    assert run(". * 2", **context) == 14.0
+    assert run("string-length()", **context) == 1.0
+    assert run("${missing}", **context) is None
+
+
+def test_empty_values_are_nan_in_arithmetic():
+    assert math.isnan(run("${a} + 1", values={"a": ""}))
+
+
+def test_nodesets():
+    values = {"prices": ["1.5", "2.5", "3"], "tags": ["a", "b"]}
+    assert run("sum(${prices})", values=values) == 7.0
+    assert run("count(${prices})", values=values) == 3.0
+    assert run("max(${prices})", values=values) == 3.0
+    assert run("${tags} = 'b'", values=values) is True
+    assert run("join(', ', ${tags})", values=values) == "a, b"
+
+
+def test_date_comparisons():
+    values = {"start": "2024-01-01", "end": "2024-02-01"}
+    assert run("${start} < ${end}", values=values) is True
+    assert run("date(${start}) + 31 = date(${end})", values=values) is True
+
+
+def test_compiled_expression_is_reusable():
+    compiled = compile_expression(parser.parse("${a} * 2"))
+    assert [compiled({"values": {"a": i}}) for i in range(3)] == [0.0, 2.0, 4.0]
+
+
+def test_once_keeps_the_current_value():
+    assert run("once(1 + 2)") == 3
+    assert run("once(1 + 2)", current="kept") == "kept"
+
+
+def test_if_is_lazy():
+    # The untaken branch would raise on the invalid pattern
+    compiled = compile_expression(parser.parse("if(${a}, 1, regex(., ${b}))"))
+    assert compiled({"values": {"a": "x", "b": "["}}) == 1.0
+
+
+def test_literal_regex_pattern_is_prebound():
+    compile_regex.cache_clear()
+    compiled = compile_expression(parser.parse("regex(., '^[a-z]+$')"))
+    assert compile_regex.cache_info().misses == 1
+    assert compiled({"current": "abc"}) is True
+    assert compiled({"current": "ABC"}) is False
+    assert compile_regex.cache_info().hits == 0
+
+
+def test_dynamic_regex_pattern_uses_cache():
+    compile_regex.cache_clear()
+    compiled = compile_expression(parser.parse("regex(., ${pattern})"))
+    for _ in range(3):
+        compiled({"current": "abc", "values": {"pattern": "b"}})
+    assert compile_regex.cache_info().misses == 1
+    assert compile_regex.cache_info().hits == 2
+
+
+def test_date_format_is_cached():
+    assert compile_date_format("%Y") is compile_date_format("%Y")
+
+
+def test_today_is_not_folded():
+    compiled = compile_expression(parser.parse("today()"))
+    assert compiled({}) == datetime.date.today()
+
+
+def test_unknown_function():
+    with pytest.raises(ValueError):
+        compile_expression(parser.parse("no-such-function(1)"))
+
+
+def test_wrong_arity():
+    with pytest.raises(ValueError):
+        compile_expression(parser.parse("round(1, 2, 3)"))
+
+
+def test_every_signature_has_an_implementation():
+    assert set(FUNCTION_SIGNATURES) <= set(FUNCTIONS)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(3.0, "3"), (0.5, "0.5"), (True, "true"), (None, ""), (math.nan, "NaN")],
+)
+def test_to_string(value, expected):
+    assert to_string(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "abc", "1_000", "inf", None, []])
+def test_to_number_nan(value):
+    assert math.isnan(to_number(value))
+
+
+def test_compile_deep_expression():
+    # Constant subtrees are folded while compiling, whatever their depth
+    assert evaluate(parser.parse(" + ".join(["1"] * 3000))) == 3000
+    compile_expression(parser.parse(" and ".join(["${a} = 1"] * 3000)))
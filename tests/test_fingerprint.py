@@ -0,0 +1,100 @@
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.fingerprint import diff_ast, diff_expressions, fingerprint, fingerprint_tree
+
+parser = XFParser()
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("${a}+1", "( ${a} + 1 )"),
+        ("concat('a', \"b\")", "concat( \"a\" ,'b' )"),
+        ("1", "1.0"),
+        ("(((x)))", "x"),
+    ],
+)
+def test_equivalent_expressions_share_fingerprint(first, second):
+    assert fingerprint(parser.parse(first)) == fingerprint(parser.parse(second))
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("${a} + 1", "${a} - 1"),
+        ("${a}", "a"),
+        ("'1'", "1"),
+        ("f(g(1))", "f(g(), 1)"),
+        ("(1 + 2) * 3", "1 + 2 * 3"),
+        ("concat('ab')", "concat('a', 'b')"),
+    ],
+)
+def test_different_expressions_differ(first, second):
+    assert fingerprint(parser.parse(first)) != fingerprint(parser.parse(second))
+
+
+def test_fingerprint_is_stable():
+    # Fingerprints key persistent caches, so they must not change across runs
+    assert fingerprint(parser.parse("${a} = 'yes'")) == "74460675b1532a6f265c964d77bd84ee"
+
+
+def test_fingerprint_tree_covers_every_node():
+    ast = parser.parse("if(${a} > 1, -${b}, 'c')")
+    fingerprints = fingerprint_tree(ast)
+    assert len(fingerprints) == 7
+    assert fingerprints[id(ast)] == fingerprint(ast)
+
+
+def test_diff_identical():
+    assert diff_ast(parser.parse("${a} + 1"), parser.parse("(${a}) + 1")) == []
+
+
+def test_diff_finds_smallest_changed_subtree():
+    old = parser.parse("${a} > 1 and selected(${b}, 'x')")
+    new = parser.parse("${a} > 1 and selected(${b}, 'y')")
+    (change,) = diff_ast(old, new)
+    assert change["kind"] == "replaced"
+    assert change["new_path"] == ("right", "arguments", 1)
+    assert change["new"] == {"type": "string_literal", "value": "y"}
+
+
+def test_diff_operator_change_replaces_node():
+    (change,) = diff_ast(parser.parse("1 + 2"), parser.parse("1 - 2"))
+    assert change["kind"] == "replaced"
+    assert change["old_path"] == ()
+
+
+def test_diff_inserted_argument():
+    old = parser.parse("concat(${a}, ${b}, ${c})")
+    new = parser.parse("concat(${a}, ' ', ${b}, ${c})")
+    (change,) = diff_ast(old, new)
+    assert change["kind"] == "added"
+    assert change["new_path"] == ("arguments", 1)
+
+
+def test_diff_removed_argument():
+    old = parser.parse("concat(${a}, ${b}, ${c})")
+    new = parser.parse("concat(${a}, ${c})")
+    (change,) = diff_ast(old, new)
+    assert change["kind"] == "removed"
+    assert change["old_path"] == ("arguments", 1)
+
+
+def test_diff_expressions():
+    old = {
+        "age.constraint": parser.parse(". > 0"),
+        "age.relevant": parser.parse("${consent} = 'yes'"),
+        "name.required": parser.parse("true()"),
+    }
+    new = {
+        "age.constraint": parser.parse(". >= 0"),
+        "age.relevant": parser.parse("${consent}='yes'"),
+        "phone.constraint": parser.parse("string-length(.) = 10"),
+    }
+    assert diff_expressions(old, new) == {
+        "added": ["phone.constraint"],
+        "removed": ["name.required"],
+        "changed": ["age.constraint"],
+        "unchanged": ["age.relevant"],
+    }
@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.fuzz import (
+    SCALING_FAMILIES,
+    ExpressionGenerator,
+    fuzz,
+    growth_exponent,
+    measure_parse,
+    scaling_run,
+)
+
+parser = XFParser()
+
+
+def test_generator_is_reproducible():
+    first = ExpressionGenerator(seed=7)
+    second = ExpressionGenerator(seed=7)
+    assert [first.expression() for _ in range(20)] == [second.expression() for _ in range(20)]
+    assert ExpressionGenerator(seed=8).expression() != ExpressionGenerator(seed=7).expression()
+
+
+def test_generator_respects_token_budget():
+    generator = ExpressionGenerator(seed=0, max_tokens=10)
+    # Closing off an expression can overshoot the budget by a few tokens
+    assert all(len(generator.tokens()) < 40 for _ in range(50))
+
+
+def test_generated_expressions_parse():
+    generator = ExpressionGenerator(seed=1, max_tokens=20)
+    for _ in range(100):
+        assert isinstance(parser.parse(" ".join(generator.tokens())), dict)
+
+
+def test_mutate_changes_tokens():
+    generator = ExpressionGenerator(seed=2)
+    tokens = generator.tokens()
+    assert any(generator.mutate(tokens) != tokens for _ in range(10))
+
+
+def test_fuzz_finds_no_unexpected_crashes():
+    report = fuzz(parser, iterations=300, seed=3, max_tokens=24)
+    assert report["parsed"] + report["rejected"] + len(report["crashes"]) == 300
+    assert report["rejected"] > 0
+    assert report["crashes"] == []
+
+
+@pytest.mark.parametrize("power", [1, 2])
+def test_growth_exponent(power):
+    sizes = [10, 100, 1000]
+    assert growth_exponent(sizes, [size**power for size in sizes]) == pytest.approx(power)
+
+
+def test_growth_exponent_needs_two_points():
+    assert math.isnan(growth_exponent([10], [1.0]))
+
+
+def test_measure_parse_records_errors():
+    measurement = measure_parse(parser, "1 +", repeats=1)
+    assert measurement["size"] == 3
+    assert measurement["error"].startswith("Unexpected")
+
+
+def test_scaling_run():
+    report = scaling_run(parser, "concat_arguments", [20, 40, 80], repeats=1, threshold=5)
+    assert [m["error"] for m in report["measurements"]] == [None, None, None]
+    assert report["measurements"][0]["size"] == len(SCALING_FAMILIES["concat_arguments"](20))
+    assert not math.isnan(report["time_exponent"])
+    assert not report["super_linear"]
@@ -0,0 +1,136 @@
+import pytest
+
+from xf_lark import ParseLimitExceeded, XFParser
+from xf_lark.evaluator import compile_expression
+from xf_lark.limits import UNTRUSTED_INPUT_LIMITS, prescan
+from xf_lark.sql import compile_condition
+from xf_lark.type_inference import infer_types
+
+parser = XFParser()
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "${a} > 1 and selected(${b}, 'x')",
+        "if(-${a} < 0, concat('(', string(-(-1)), ')'), 0)",
+        "- - 1 + -2",
+    ],
+)
+def test_within_limits_parses_as_without(expression):
+    assert parser.parse(expression, limits=UNTRUSTED_INPUT_LIMITS) == parser.parse(expression)
+
+
+@pytest.mark.parametrize(
+    "expression, limits, limit",
+    [
+        ("1 + 1", {"max_length": 4}, "max_length"),
+        ("1 + 1 + 1", {"max_tokens": 4}, "max_tokens"),
+        ("f(g(h(1)))", {"max_depth": 2}, "max_depth"),
+        ("- - - 1", {"max_depth": 2}, "max_depth"),
+        ("-(-(1))", {"max_depth": 3}, "max_depth"),
+        ("1 + 2 * 3", {"max_depth": 1}, "max_depth"),
+        ("f(1 and 2 and 3)", {"max_depth": 2}, "max_depth"),
+        ("1 * 2 * 3 * 4 + 5", {"max_depth": 3}, "max_depth"),
+        ("(1 + 2 + 3) * 4", {"max_depth": 3}, "max_depth"),
+        ("concat(1, 2, 3)", {"max_nodes": 3}, "max_nodes"),
+        ("${a} + ${b}", {"max_nodes": 2}, "max_nodes"),
+    ],
+)
+def test_limit_exceeded(expression, limits, limit):
+    with pytest.raises(ParseLimitExceeded) as error:
+        parser.parse(expression, limits=limits)
+    assert error.value.limit == limit
+    assert error.value.maximum == limits[limit]
+
+
+@pytest.mark.parametrize(
+    "expression, limits",
+    [
+        ("1 + 1", {"max_length": 5}),
+        ("1 + 1 + 1", {"max_tokens": 5}),
+        ("f(g(1))", {"max_depth": 2}),
+        ("- 1 - - 1 * - 1", {"max_depth": 3}),
+        ("1 + 2 * 3", {"max_depth": 2}),
+        ("f(1 + 2, 3 + 4, (5))", {"max_depth": 2}),
+        ("-(1) + -(-1)", {"max_depth": 4}),
+        ("${a} = 1 and ${b} = 2", {"max_depth": 2}),
+        ("1 * 2 * 3 * 4 + 5", {"max_depth": 4}),
+        ("concat(1, 2, 3)", {"max_nodes": 4}),
+        ("(((${a})))", {"max_nodes": 1}),
+    ],
+)
+def test_limit_not_exceeded(expression, limits):
+    assert parser.parse(expression, limits=limits) == parser.parse(expression)
+
+
+def test_prescan_rejects_before_parsing():
+    # Parentheses inside strings don't count, and the invalid syntax is never reached
+    prescan("concat('((((((', )", {"max_depth": 1})
+    with pytest.raises(ParseLimitExceeded) as error:
+        parser.parse("((((((" + "@" * 10, limits={"max_depth": 5})
+    assert error.value.position is None
+
+
+def test_abort_reports_position():
+    with pytest.raises(ParseLimitExceeded) as error:
+        parser.parse("1 + 2 + 3 + @", limits={"max_tokens": 3})
+    assert error.value.position == 6
+    assert "max_tokens=3 at position 6" in str(error.value)
+
+
+def test_tokens_abort_early():
+    expression = " + ".join(["1"] * 200_000)
+    with pytest.raises(ParseLimitExceeded) as error:
+        parser.parse(expression, limits={"max_tokens": 100})
+    # The 101st token, long before the end of the expression
+    assert error.value.position == 200
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        " and ".join(["${a} = 1"] * 400),
+        " + ".join(["1"] * 900),
+        "-" * 900 + "1",
+        "concat(" * 40 + "1 or " * 40 + "1" + ")" * 40,
+    ],
+)
+def test_untrusted_limits_reject_deep_trees(expression):
+    with pytest.raises(ParseLimitExceeded) as error:
+        parser.parse(expression, limits=UNTRUSTED_INPUT_LIMITS)
+    assert error.value.limit == "max_depth"
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        " and ".join(["${a} = 1"] * 32),
+        " + ".join(["1"] * 64),
+        "concat(" * 32 + "${a}" + ")" * 32 + " or ${b}" * 32,
+        " and ".join(f"${{q{i}}} != ''" for i in range(40)),
+    ],
+)
+def test_within_untrusted_limits_evaluates(expression):
+    ast = parser.parse(expression, limits=UNTRUSTED_INPUT_LIMITS)
+    infer_types(ast)
+    compile_condition(ast)
+    compile_expression(ast)({"values": {"a": 1, "b": 2}})
+
+
+def test_timeout():
+    with pytest.raises(ParseLimitExceeded) as error:
+        parser.parse(" + ".join(["1"] * 10_000), limits={"timeout": 0})
+    assert error.value.limit == "timeout"
+
+
+def test_limit_errors_are_value_errors():
+    with pytest.raises(ValueError):
+        parser.parse("1 + 1", limits={"max_length": 1})
+
+
+def test_deep_nesting_without_limits():
+    ast = parser.parse("(" * 5000 + "-" * 5000 + "1" + ")" * 5000)
+    for _ in range(5000):
+        ast = ast["operand"]
+    assert ast == {"type": "number_literal", "value": 1.0}
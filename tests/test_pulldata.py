@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.evaluator import evaluate
+from xf_lark.pulldata import PulldataSource, pulldata_calls
+
+parser = XFParser()
+
+
+@pytest.fixture
+def households_csv(tmp_path):
+    path = tmp_path / "households.csv"
+    rows = ["hh_id,head_name,village"]
+    rows += [f"{i},Head {i},Village {i % 7}" for i in range(1, 501)]
+    rows += ['501,"Doe, Jane","multi\nline"', "502,Second,x", "5,Duplicate,y"]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return path
+
+
+def test_lookup(households_csv):
+    with PulldataSource(households_csv) as source:
+        assert source.lookup("head_name", "hh_id", "42") == "Head 42"
+        assert source.lookup("village", "hh_id", "42") == "Village 0"
+        assert source.lookup("head_name", "hh_id", "missing") == ""
+
+
+def test_quoted_fields_and_multiline_records(households_csv):
+    with PulldataSource(households_csv) as source:
+        assert source.lookup("head_name", "hh_id", "501") == "Doe, Jane"
+        assert source.lookup("village", "hh_id", "501") == "multi\nline"
+        assert source.lookup("head_name", "hh_id", "502") == "Second"
+
+
+def test_first_match_wins(households_csv):
+    with PulldataSource(households_csv) as source:
+        assert source.lookup("head_name", "hh_id", "5") == "Head 5"
+
+
+def test_lookup_by_other_column(households_csv):
+    with PulldataSource(households_csv) as source:
+        assert source.lookup("hh_id", "head_name", "Head 7") == "7"
+
+
+def test_index_is_persisted_and_reused(households_csv, tmp_path):
+    with PulldataSource(households_csv, index_dir=tmp_path / "indexes") as source:
+        source.prepare("hh_id")
+        index_path = source.index_path("hh_id")
+    built_at = index_path.stat().st_mtime_ns
+
+    with PulldataSource(households_csv, index_dir=tmp_path / "indexes") as source:
+        assert source.lookup("head_name", "hh_id", "1") == "Head 1"
+    assert index_path.stat().st_mtime_ns == built_at
+
+
+def test_stale_index_is_rebuilt(households_csv):
+    with PulldataSource(households_csv) as source:
+        source.prepare("hh_id")
+
+    households_csv.write_text("hh_id,head_name\n1,Changed\n", encoding="utf-8")
+    stat = households_csv.stat()
+    os.utime(households_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    with PulldataSource(households_csv) as source:
+        assert source.lookup("head_name", "hh_id", "1") == "Changed"
+
+
+def test_unknown_column(households_csv):
+    with PulldataSource(households_csv) as source:
+        with pytest.raises(ValueError):
+            source.lookup("nope", "hh_id", "1")
+
+
+def test_pulldata_function(households_csv):
+    ast = parser.parse("pulldata('households', 'head_name', 'hh_id', ${hh_id})")
+    with PulldataSource(households_csv) as source:
+        context = {"values": {"hh_id": 12.0}, "pulldata": {"households": source}}
+        assert evaluate(ast, context) == "Head 12"
+
+
+def test_pulldata_missing_source():
+    ast = parser.parse("pulldata('households', 'head_name', 'hh_id', 1)")
+    with pytest.raises(ValueError):
+        evaluate(ast, {})
+
+
+def test_pulldata_calls():
+    ast = parser.parse(
+        "concat(pulldata('hh', 'name', 'id', ${id}), pulldata(${src}, 'a', 'b', 1))"
+    )
+    assert pulldata_calls(ast) == [("hh", "name", "id")]
+
+
+def test_unwritable_index_dir_falls_back(households_csv, tmp_path):
+    # A directory below a regular file cannot be created, even by root
+    unwritable = households_csv / "indexes"
+    fallback = tmp_path / "cache"
+    with PulldataSource(households_csv, index_dir=unwritable, fallback_dir=fallback) as source:
+        assert source.lookup("head_name", "hh_id", "3") == "Head 3"
+    assert source.fallback_index_path("hh_id").parent == fallback
+    assert source.fallback_index_path("hh_id").exists()
+
+    with PulldataSource(households_csv, index_dir=unwritable, fallback_dir=fallback) as source:
+        source.prepare("hh_id")
+        assert source.lookup("head_name", "hh_id", "4") == "Head 4"
+
+
+def test_concurrent_index_builds(households_csv):
+    sources = [PulldataSource(households_csv) for _ in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        paths = list(executor.map(lambda source: source.build_index("hh_id"), sources))
+    for source in sources:
+        assert source.lookup("head_name", "hh_id", "9") == "Head 9"
+        source.close()
+    assert set(paths) == {households_csv.parent / "households.csv.hh_id.idx"}
+    assert not list(households_csv.parent.glob("*.tmp"))
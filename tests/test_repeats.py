@@ -0,0 +1,126 @@
+import math
+import random
+
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.evaluator import compile_expression
+from xf_lark.functions import xf_max, xf_min, xf_sum
+from xf_lark.repeats import RepeatColumn, RepeatGroup
+
+parser = XFParser()
+
+
+def test_column_aggregates():
+    column = RepeatColumn(["1.5", "2.5", "4"])
+    assert column.sum() == 8.0
+    assert column.count() == 3.0
+    assert column.max() == 4.0
+    assert column.min() == 1.5
+
+
+def test_empty_values_make_numeric_aggregates_nan():
+    column = RepeatColumn(["1", ""])
+    assert math.isnan(column.sum())
+    assert math.isnan(column.max())
+    assert column.count() == 2.0
+    assert column.count_non_empty() == 1.0
+    column.set(1, "2")
+    assert column.sum() == 3.0
+
+
+def test_empty_column():
+    column = RepeatColumn()
+    assert column.sum() == 0.0
+    assert column.count() == 0.0
+    assert math.isnan(column.max())
+
+
+def test_incremental_updates_match_recomputation():
+    rng = random.Random(7)
+    column = RepeatColumn()
+    values: list[str] = []
+    for _ in range(2000):
+        action = rng.random()
+        if action < 0.6 or not values:
+            value = str(round(rng.uniform(-100, 100), 2))
+            column.append(value)
+            values.append(value)
+        elif action < 0.85:
+            index = rng.randrange(len(values))
+            value = str(round(rng.uniform(-100, 100), 2))
+            column.set(index, value)
+            values[index] = value
+        else:
+            index = rng.randrange(len(values))
+            column.remove(index)
+            del values[index]
+
+        if rng.random() < 0.05:
+            assert column.sum() == pytest.approx(xf_sum(values), abs=1e-9)
+            assert column.max() == xf_max(values)
+            assert column.min() == xf_min(values)
+            assert column.count() == len(values)
+
+
+def test_group_instances():
+    group = RepeatGroup(["name", "age"])
+    group.add_instance({"name": "Ada", "age": "36"})
+    group.add_instance({"name": "Bob"})
+    group.add_instance({"name": "Cy", "age": "12", "role": "child"})
+    assert group.instance(1) == {"name": "Bob", "age": "", "role": ""}
+    assert group.nodeset("role") == ["", "", "child"]
+    group.update_instance(1, {"age": "40"})
+    assert group.columns["age"].max() == 40.0
+    group.remove_instance(0)
+    assert group.nodeset("name") == ["Bob", "Cy"]
+    with pytest.raises(IndexError):
+        group.update_instance(5, {"age": "1"})
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("sum(${price})", 6.0),
+        ("count(${price})", 3.0),
+        ("max(${price}) - min(${price})", 2.0),
+        ("count-non-empty(${note})", 1.0),
+        ("sum(${price}) div count(${price})", 2.0),
+    ],
+)
+def test_evaluator_uses_repeat_columns(expression, expected):
+    group = RepeatGroup()
+    for price, note in (("1", ""), ("2", "x"), ("3", "")):
+        group.add_instance({"price": price, "note": note})
+    compiled = compile_expression(parser.parse(expression))
+    assert compiled({"repeats": group.columns}) == expected
+
+
+def test_repeat_fields_are_nodesets():
+    group = RepeatGroup()
+    for name in ("a", "b"):
+        group.add_instance({"name": name})
+    compiled = compile_expression(parser.parse("join(',', ${name})"))
+    assert compiled({"repeats": group.columns}) == "a,b"
+
+
+def test_aggregates_fall_back_without_repeats():
+    compiled = compile_expression(parser.parse("sum(${price})"))
+    assert compiled({"values": {"price": ["1", "2"]}}) == 3.0
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("sum(${price})", 3.0),
+        ("count(${price})", 2.0),
+        ("join(',', ${price})", "1,2"),
+        ("${price}", ["1", "2"]),
+    ],
+)
+def test_repeats_take_precedence_over_values(expression, expected):
+    group = RepeatGroup()
+    for price in ("1", "2"):
+        group.add_instance({"price": price})
+    compiled = compile_expression(parser.parse(expression))
+    assert compiled({"values": {"price": "10"}, "repeats": group.columns}) == expected
@@ -0,0 +1,137 @@
+import csv
+import json
+
+import pytest
+
+from xf_lark.revalidate import parse_rules, revalidate_csv
+
+fields = {
+    "age": {"required": "yes", "constraint": ". >= 0 and . < 120"},
+    "consent": {"required": "true()", "constraint": ". = 'yes' or . = 'no'"},
+    "reason": {"relevant": "${consent} = 'no'", "required": "${age} >= 18"},
+    "phone": {"column": "contact-phone", "constraint": "regex(., '^[0-9]{10}$')"},
+}
+
+
+@pytest.fixture
+def export_csv(tmp_path):
+    path = tmp_path / "export.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["age", "consent", "reason", "contact-phone"])
+        for i in range(250):
+            writer.writerow([str(i % 130), "yes", "", "0123456789"])
+        writer.writerow(["", "maybe", "", "123"])
+        writer.writerow(["30", "no", "", ""])
+        writer.writerow(["10", "no", "", ""])
+    return path
+
+
+def read_violations(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def expected_violations():
+    violations = [
+        {"row": i + 1, "field": "age", "rule": "constraint", "value": str(i % 130),
+         "expression": ". >= 0 and . < 120"}
+        for i in range(250)
+        if i % 130 >= 120
+    ]
+    violations += [
+        {"row": 251, "field": "age", "rule": "required", "value": "", "expression": "yes"},
+        {"row": 251, "field": "consent", "rule": "constraint", "value": "maybe",
+         "expression": ". = 'yes' or . = 'no'"},
+        {"row": 251, "field": "phone", "rule": "constraint", "value": "123",
+         "expression": "regex(., '^[0-9]{10}$')"},
+        {"row": 252, "field": "reason", "rule": "required", "value": "",
+         "expression": "${age} >= 18"},
+    ]
+    return violations
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_revalidate_csv(export_csv, tmp_path, workers):
+    output = tmp_path / "violations.ndjson"
+    report = revalidate_csv(fields, export_csv, output, chunk_size=16, workers=workers)
+    assert report["rows"] == 253
+    assert report["violations"] == len(expected_violations())
+    assert report["rows_per_second"] > 0
+    assert read_violations(output) == expected_violations()
+
+
+def test_bounded_pending_chunks(export_csv, tmp_path):
+    output = tmp_path / "violations.ndjson"
+    revalidate_csv(fields, export_csv, output, chunk_size=7, workers=1, max_pending_chunks=1)
+    assert read_violations(output) == expected_violations()
+
+
+def test_parse_rules_required_words():
+    parsed = parse_rules({"a": {"required": "yes"}, "b": {}, "c": {"required": "${a} = 1"}})
+    assert parsed["a"]["required"] is True
+    assert parsed["b"]["required"] is False
+    assert parsed["c"]["required"]["type"] == "binary_op"
+
+
+def test_invalid_chunk_size(export_csv, tmp_path):
+    with pytest.raises(ValueError):
+        revalidate_csv(fields, export_csv, tmp_path / "out.ndjson", chunk_size=0)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_errors_are_reported_per_row(tmp_path, workers):
+    export = tmp_path / "export.csv"
+    export.write_text("code,pattern\nabc,^a\nabc,(\nxyz,^x\n", encoding="utf-8")
+    output = tmp_path / "violations.ndjson"
+    report = revalidate_csv(
+        {"code": {"constraint": "regex(., ${pattern})"}}, export, output, workers=workers
+    )
+    assert report["rows"] == 3
+    (violation,) = read_violations(output)
+    assert violation["row"] == 2
+    assert violation["rule"] == "error"
+    assert violation["expression"] == "regex(., ${pattern})"
+    assert violation["error"].startswith("error: ")
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_pulldata_sources(tmp_path, workers):
+    households = tmp_path / "households.csv"
+    households.write_text("hh_id,size\n1,4\n2,7\n", encoding="utf-8")
+    export = tmp_path / "export.csv"
+    export.write_text("hh,members\n1,4\n2,5\n3,1\n", encoding="utf-8")
+    output = tmp_path / "violations.ndjson"
+    rules = {"members": {"constraint": ". = pulldata('households', 'size', 'hh_id', ${hh})"}}
+    revalidate_csv(
+        rules, export, output, workers=workers, pulldata={"households": households}
+    )
+    assert [(v["row"], v["rule"]) for v in read_violations(output)] == [
+        (2, "constraint"),
+        (3, "constraint"),
+    ]
+
+
+def test_unknown_pulldata_source_is_an_error(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text("hh\n1\n", encoding="utf-8")
+    output = tmp_path / "violations.ndjson"
+    rules = {"hh": {"constraint": "pulldata('missing', 'a', 'b', .) = ''"}}
+    revalidate_csv(rules, export, output, workers=0)
+    (violation,) = read_violations(output)
+    assert violation["rule"] == "error"
+    assert "missing" in violation["error"]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_invalid_literal_pattern_is_reported_before_checking(tmp_path, workers):
+    export = tmp_path / "export.csv"
+    export.write_text("code\nabc\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="constraint expression of 'code'") as error:
+        revalidate_csv(
+            {"code": {"constraint": "regex(., '(')"}},
+            export,
+            tmp_path / "out.ndjson",
+            workers=workers,
+        )
+    assert "regex(., '(')" in str(error.value)
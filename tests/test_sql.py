@@ -0,0 +1,199 @@
+import sqlite3
+
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.evaluator import evaluate
+from xf_lark.functions import to_boolean, to_string
+from xf_lark.sql import SQLCompileError, compile_condition, compile_to_sql
+
+parser = XFParser()
+
+rows = [
+    {"age": "25", "name": "Ada", "colors": "red blue", "consent": "yes", "score": "3.5"},
+    {"age": "17", "name": "Bob", "colors": "green", "consent": "no", "score": "-2.5"},
+    {"age": "", "name": "", "colors": "", "consent": "", "score": ""},
+    {"age": "40", "name": "Chloé", "colors": "blue", "consent": "yes", "score": "10"},
+    {"age": "0", "name": "Dan", "colors": "red green blue", "consent": "yes", "score": "0.5"},
+]
+# Dirty text, dates and numbers stored as REAL or INTEGER
+extra_columns = [
+    {"text": "abc", "day": "2020-01-01", "real": 5.0, "int": 3},
+    {"text": " 12 ", "day": "2019-06-30T12:00:00", "real": 2.5, "int": -1},
+    {"text": "", "day": "", "real": None, "int": None},
+    {"text": "1e3", "day": "now", "real": -1.0, "int": 0},
+    {"text": ".5", "day": "1969-12-31", "real": 0.0, "int": 40},
+]
+for row, extra in zip(rows, extra_columns):
+    row.update(extra)
+
+column_types = {"real": "REAL", "int": "INTEGER"}
+
+
+@pytest.fixture(scope="module")
+def connection():
+    connection = sqlite3.connect(":memory:")
+    columns = list(rows[0])
+    definitions = ", ".join(f'"{c}" {column_types.get(c, "TEXT")}' for c in columns)
+    connection.execute(f"CREATE TABLE submissions (id INTEGER PRIMARY KEY, {definitions})")
+    for i, row in enumerate(rows):
+        connection.execute(
+            f"INSERT INTO submissions VALUES (?, {', '.join('?' for _ in columns)})",
+            [i, *row.values()],
+        )
+    yield connection
+    connection.close()
+
+
+def select_matching(connection, expression, **options):
+    condition = compile_condition(parser.parse(expression), **options)
+    query = f"SELECT id FROM submissions WHERE {condition['sql']} ORDER BY id"
+    return [row_id for (row_id,) in connection.execute(query, condition["params"])]
+
+
+def python_matching(expression, current=None):
+    ast = parser.parse(expression)
+    return [
+        i
+        for i, row in enumerate(rows)
+        if to_boolean(evaluate(ast, {"values": row, "current": row.get(current)}))
+    ]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "${age} >= 18",
+        "${age} < 18",
+        "${age} != 17",
+        "not(${age} > 18)",
+        "${age} = ''",
+        "${age} = 25 and ${consent} = 'yes'",
+        "${consent} = 'yes' or ${age} < 20",
+        "selected(${colors}, 'blue')",
+        "count-selected(${colors}) >= 2",
+        "string-length(${name}) = 3",
+        "contains(${name}, 'o')",
+        "starts-with(${name}, 'Ch')",
+        "ends-with(${name}, 'b')",
+        "concat(${name}, '-', ${age}) = 'Ada-25'",
+        "concat(${age} * 2, '') = '50'",
+        "${age} div 2 > 10",
+        "${age} div ${age} = 1",
+        "-${age} < -20",
+        "round(${score}) = 4 or round(${score}) = -2",
+        "round(${score}, 0) = -3",
+        "round(${age}, -1) = 20",
+        "round(${score}, -1) = 10",
+        "int(${score}) = -2",
+        "floor(${score}) = -3",
+        "ceiling(${score}) = 4",
+        "abs(${score}) > 2",
+        "if(${age} > 18, 'adult', 'minor') = 'adult'",
+        "coalesce(${name}, 'unknown') = 'unknown'",
+        "${consent}",
+        "${age} = ${age}",
+        "true() and not(false())",
+        "(${age} > 1) = true()",
+        "${text} = 0",
+        "${text} > 10",
+        "${text} * 2 = 1",
+        "${text} != ${text}",
+        "${day} > 18000",
+        "${day} < 0",
+        "${day} = 18077.5",
+        "${real} = '5'",
+        "${real} = 5",
+        "${real} > ${int}",
+        "${int} = '3'",
+        "concat(${real}, ${int}) = '53'",
+        "1 div 0 > 5",
+        "-1 div 0 < -5",
+        "${age} div 0 > 5",
+        "${real} div ${int} < 0",
+        "${score} mod 2 = 1.5",
+        "${score} mod -2 < 0",
+        "${age} mod 0 = 0",
+        "string(${age} div 0) = 'Infinity'",
+        "floor(1 div 0) > 5",
+        "floor(floor(floor(${score}))) = -3",
+        "coalesce(coalesce(${name}, ${age}), 'x') = 'x'",
+        "number(string(${score} div 2)) < 0",
+    ],
+)
+def test_parity_with_python_evaluator(connection, expression):
+    assert select_matching(connection, expression) == python_matching(expression)
+
+
+@pytest.mark.parametrize("expression", [". >= 18", "string-length() = 2", "string() = '25'"])
+def test_current_column(connection, expression):
+    assert select_matching(connection, expression, current_column="age") == python_matching(
+        expression, current="age"
+    )
+
+
+def test_column_mapping(connection):
+    assert select_matching(connection, "${q_age} > 30", columns={"q_age": "age"}) == [3]
+
+
+def test_numeric_field_hints(connection):
+    assert select_matching(connection, "${age} > 18", field_types={"age": "integer"}) == [0, 3]
+
+
+def test_value_expression(connection):
+    compiled = compile_to_sql(parser.parse("concat(${name}, ':', ${age} + 1)"))
+    query = f"SELECT {compiled['sql']} FROM submissions ORDER BY id"
+    sql_values = [value for (value,) in connection.execute(query, compiled["params"])]
+    ast = parser.parse("concat(${name}, ':', ${age} + 1)")
+    assert sql_values == [to_string(evaluate(ast, {"values": row})) for row in rows]
+
+
+@pytest.mark.parametrize(
+    "template",
+    ["floor({})", "round({})", "ceiling({})", "number(string({}))", "1 div {}"],
+)
+@pytest.mark.parametrize("dialect", ["sqlite", "postgres"])
+def test_nested_calls_grow_linearly(template, dialect):
+    expression = "${score}"
+    for _ in range(20):
+        expression = template.format(expression)
+    compiled = compile_to_sql(parser.parse(expression), dialect=dialect)
+    assert len(compiled["sql"]) < 20 * 1000
+
+
+def test_postgres_native_rounding():
+    compiled = compile_to_sql(parser.parse("floor(${a}) + ceiling(${b})"), dialect="postgres")
+    assert "FLOOR(" in compiled["sql"] and "CEIL(" in compiled["sql"]
+
+
+def test_deep_expression():
+    compiled = compile_to_sql(parser.parse(" + ".join(["1"] * 3000)))
+    assert compiled["params"] == [1.0] * 3000
+
+
+def test_literals_are_parameters():
+    compiled = compile_condition(parser.parse("${name} = \"x' OR 1=1\""))
+    assert "OR 1=1" not in compiled["sql"]
+    assert compiled["params"] == ["x' OR 1=1"]
+
+
+def test_postgres_placeholders():
+    compiled = compile_condition(parser.parse("contains(${name}, 'a')"), dialect="postgres")
+    assert "%s" in compiled["sql"] and "STRPOS" in compiled["sql"]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "regex(${name}, 'a')",
+        "bare_name = 1",
+        ". = 1",
+        "count(${x})",
+        "round(1, 2, 3)",
+        "string-length() > 3",
+        "string() = 'a'",
+    ],
+)
+def test_unsupported(expression):
+    with pytest.raises(SQLCompileError):
+        compile_condition(parser.parse(expression))
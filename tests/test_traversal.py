@@ -0,0 +1,135 @@
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.traversal import (
+    SKIP,
+    Transformer,
+    Visitor,
+    iter_children,
+    transform,
+    walk,
+    walk_with_paths,
+)
+
+parser = XFParser()
+
+
+def test_iter_children_paths():
+    ast = parser.parse("f(1, -x)")
+    assert [path for path, _ in iter_children(ast)] == [("arguments", 0), ("arguments", 1)]
+    assert list(iter_children(ast["arguments"][0])) == []
+
+
+def test_walk_orders():
+    ast = parser.parse("${a} + f(1, 2)")
+    pre = [node["type"] for node in walk(ast)]
+    post = [node["type"] for node in walk(ast, order="post")]
+    assert pre == ["binary_op", "variable_ref", "function_call", "number_literal", "number_literal"]
+    assert post == ["variable_ref", "number_literal", "number_literal", "function_call", "binary_op"]
+
+
+def test_walk_paths_locate_nodes():
+    ast = parser.parse("if(${a} > 1, -${b}, 'c')")
+    paths = []
+    for path, node in walk_with_paths(ast, order="post"):
+        paths.append(path)
+        located = ast
+        for step in path:
+            located = located[step]
+        assert located is node
+    assert paths[-1] == ()
+    assert [path for path, _ in walk_with_paths(ast)] == paths[-1:] + [
+        ("arguments", 0),
+        ("arguments", 0, "left"),
+        ("arguments", 0, "right"),
+        ("arguments", 1),
+        ("arguments", 1, "operand"),
+        ("arguments", 2),
+    ]
+
+
+def test_walk_rejects_unknown_order():
+    with pytest.raises(ValueError):
+        list(walk(parser.parse("1"), order="in"))
+
+
+def deep_ast(depth):
+    ast = {"type": "variable_ref", "name": "a"}
+    for _ in range(depth):
+        ast = {"type": "unary_op", "operator": "unary_minus", "operand": ast}
+    return ast
+
+
+def test_walk_deep_ast():
+    assert sum(1 for _ in walk(deep_ast(100_000), order="post")) == 100_001
+
+
+class References(Visitor):
+    def __init__(self):
+        self.names = []
+        self.others = 0
+
+    def visit_variable_ref(self, node):
+        self.names.append(node["name"])
+
+    def visit_function_call(self, node):
+        if node["name"] == "once":
+            return SKIP
+
+    def generic_visit(self, node):
+        self.others += 1
+
+
+def test_visitor_dispatch_and_skip():
+    visitor = References()
+    visitor.visit(parser.parse("${a} + once(${b}) * ${c}"))
+    assert visitor.names == ["a", "c"]
+    assert visitor.others == 2
+    assert References._dispatch == {
+        "variable_ref": "visit_variable_ref",
+        "function_call": "visit_function_call",
+    }
+
+
+def test_visitor_deep_ast():
+    visitor = References()
+    visitor.visit(deep_ast(100_000))
+    assert visitor.names == ["a"]
+
+
+class Rename(Transformer):
+    def transform_variable_ref(self, node):
+        if node["name"] == "old":
+            return {"type": "variable_ref", "name": "new"}
+        return node
+
+
+def test_transformer_rewrites_and_shares_unchanged_subtrees():
+    ast = parser.parse("${old} > 1 and selected(${other}, 'x')")
+    result = Rename().transform(ast)
+    assert result == parser.parse("${new} > 1 and selected(${other}, 'x')")
+    assert result["right"] is ast["right"]
+    assert ast == parser.parse("${old} > 1 and selected(${other}, 'x')")
+
+
+def test_transformer_sees_transformed_children():
+    def fold(node):
+        if node["type"] == "binary_op" and node["operator"] == "add":
+            left, right = node["left"], node["right"]
+            if left["type"] == right["type"] == "number_literal":
+                return {"type": "number_literal", "value": left["value"] + right["value"]}
+        return node
+
+    assert transform(parser.parse("f(1 + 2 + 3, ${a} + 1)"), fold) == parser.parse(
+        "f(6, ${a} + 1)"
+    )
+
+
+def test_transformer_deep_ast():
+    result = Rename().transform(
+        {"type": "unary_op", "operator": "unary_minus", "operand": deep_ast(100_000)}
+    )
+    node = result
+    while node["type"] == "unary_op":
+        node = node["operand"]
+    assert node == {"type": "variable_ref", "name": "a"}
@@ -0,0 +1,120 @@
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.type_inference import infer_types, xlsform_type_to_xf_type
+
+parser = XFParser()
+
+
+@pytest.mark.parametrize(
+    "expression, expected_type",
+    [
+        ("1 + 2", "number"),
+        ("'a'", "string"),
+        ("${a} = 'yes'", "boolean"),
+        ("${a} > 1 and ${b} < 2", "boolean"),
+        ("-${a}", "number"),
+        ("concat('a', ${b})", "string"),
+        ("today()", "date"),
+        ("if(${a}, 1, 2)", "number"),
+        ("if(${a}, 1, 'two')", "any"),
+        ("unknown_function(1)", "any"),
+        ("${a}", "any"),
+    ],
+)
+def test_root_type(expression, expected_type):
+    result = infer_types(parser.parse(expression))
+    assert result.root_type == expected_type
+    assert result.ok
+
+
+def test_every_node_is_annotated():
+    ast = parser.parse("${price} * 2 > 10")
+    result = infer_types(ast, field_types={"price": "decimal"})
+    assert result.type_of(ast) == "boolean"
+    assert result.type_of(ast["left"]) == "number"
+    assert result.type_of(ast["left"]["left"]) == "number"
+    assert result.type_of(ast["right"]) == "number"
+
+
+def test_field_type_hints():
+    ast = parser.parse("coalesce(${district}, ${fallback})")
+    result = infer_types(
+        ast,
+        field_types={"district": "select_one districts", "fallback": "text"},
+    )
+    assert result.root_type == "string"
+
+
+def test_current_type_hint():
+    ast = parser.parse(".")
+    assert infer_types(ast, current_type="integer").root_type == "number"
+
+
+def test_once_is_untyped():
+    # once() returns the current value when it is already set, whatever its argument
+    ast = parser.parse("once(1 + 2)")
+    assert infer_types(ast).root_type == "any"
+
+
+@pytest.mark.parametrize(
+    "xlsform_type, expected",
+    [
+        ("integer", "number"),
+        ("select_multiple colors", "string"),
+        ("begin repeat", "nodeset"),
+        ("dateTime", "date"),
+        ("boolean", "boolean"),
+        ("note", "any"),
+        ("", "any"),
+    ],
+)
+def test_xlsform_type_to_xf_type(xlsform_type, expected):
+    assert xlsform_type_to_xf_type(xlsform_type) == expected
+
+
+@pytest.mark.parametrize(
+    "expression, expected_path",
+    [
+        ("'abc' + 1", ("left",)),
+        ("-'abc'", ("operand",)),
+        ("${a} < 'abc'", ("right",)),
+        ("round(1, 2, 3)", ()),
+        ("today(1)", ()),
+        ("concat(sum('x'))", ("arguments", 0, "arguments", 0)),
+        ("count(1 + 2)", ("arguments", 0)),
+    ],
+)
+def test_guaranteed_type_errors(expression, expected_path):
+    result = infer_types(parser.parse(expression))
+    assert not result.ok
+    assert [issue["path"] for issue in result.issues] == [expected_path]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["'12' + 1", "count(${repeat_field})", "sum(.)", "max(1, 2, 3)"],
+)
+def test_no_false_positives(expression):
+    assert infer_types(parser.parse(expression)).ok
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("'abc' + 1", "'abc' is not a number; add always yields NaN"),
+        ("-'abc'", "'abc' is not a number; negation always yields NaN"),
+        ("${a} < 'abc'", "'abc' is not a number; lt comparison is always false"),
+    ],
+)
+def test_numeric_operand_messages(expression, message):
+    (issue,) = infer_types(parser.parse(expression)).issues
+    assert issue["message"].endswith(message)
+
+
+def test_deep_expression():
+    ast = parser.parse("(" * 3000 + "-'a'" + ")" * 3000 + " + 1" * 3000)
+    result = infer_types(ast)
+    assert result.root_type == "number"
+    (issue,) = result.issues
+    assert issue["path"] == ("left",) * 3000 + ("operand",)
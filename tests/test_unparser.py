@@ -0,0 +1,92 @@
+import math
+
+import pytest
+
+from xf_lark import XFParser
+from xf_lark.unparser import canonicalize, format_number_literal, unparse
+
+parser = XFParser()
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("( ${a} + 1 )", "${a}+1"),
+        ("1 + (2 + 3)", "1+(2+3)"),
+        ("(1 + 2) + 3", "1+2+3"),
+        ("(1 + 2) * 3", "(1+2)*3"),
+        ("1 - (2 - 3)", "1-(2-3)"),
+        ("1 div (2 * 3)", "1 div (2*3)"),
+        ("(1 = 2) = 3", "(1=2)=3"),
+        ("1 = (2 = 3)", "1=(2=3)"),
+        ("-(1 + 2)", "-(1+2)"),
+        ("- - 1", "--1"),
+        ("a - 1", "a -1"),
+        ("${a} - 1", "${a}-1"),
+        ("(a) or (b and c)", "a or b and c"),
+        ("(a or b) and c", "(a or b) and c"),
+        ("concat( \"a\" , 'b' )", "concat('a','b')"),
+        ("\"it's\"", "\"it's\""),
+        ("(7 mod 2) * 3", "7 mod 2*3"),
+        ("7 mod (2 mod 3)", "7 mod (2 mod 3)"),
+        ("1.0", "1"),
+        ("0.50", ".5"),
+        ("1e20", "1e20"),
+        ("0.0000001", "1e-7"),
+        ("1.5e300", "1.5e300"),
+        (". != ..", ".!=.."),
+        ("today()", "today()"),
+    ],
+)
+def test_canonical_form(expression, expected):
+    assert canonicalize(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "${a} > 1 and selected(${b}, 'x') or not(${c} = '')",
+        "if(${age} >= 18, 'adult', concat('minor: ', string(${age})))",
+        "-${a} * -(${b} - 3) div 2 + 1.25e-7",
+        "((1 < 2) != (3 >= 4)) = (5 <= 6)",
+        "a-b - c-d",
+        "android and divide or order",
+        "count-selected(.) > 0.1 - 1 - -1",
+        "coalesce(${x}, ${y}, '\"')",
+    ],
+)
+def test_round_trip(expression):
+    ast = parser.parse(expression)
+    assert parser.parse(unparse(ast)) == ast
+
+
+def test_round_trip_of_deep_ast():
+    ast = {"type": "number_literal", "value": 1.0}
+    for _ in range(5000):
+        ast = {"type": "unary_op", "operator": "unary_minus", "operand": ast}
+    assert unparse(ast) == "-" * 5000 + "1"
+
+
+@pytest.mark.parametrize("value", [0.0, 1.0, 0.1, 123456789.0, 1e-7, 1e300, 2.5e16])
+def test_number_literals_round_trip(value):
+    assert float(format_number_literal(value)) == value
+
+
+@pytest.mark.parametrize("value", [-1.0, math.inf, math.nan])
+def test_unwritable_numbers(value):
+    with pytest.raises(ValueError):
+        format_number_literal(value)
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        {"type": "string_literal", "value": "'\""},
+        {"type": "bare_variable_ref", "name": "and"},
+        {"type": "variable_ref", "name": "a}"},
+        {"type": "function_call", "name": "1f", "arguments": []},
+    ],
+)
+def test_unwritable_nodes(node):
+    with pytest.raises(ValueError):
+        unparse(node)
@@ -1,3 +1,4 @@
+from .limits import ParseLimitExceeded, ParseLimits
 from .parser import XFParser
 
-__all__ = ["XFParser"]
+__all__ = ["ParseLimitExceeded", "ParseLimits", "XFParser"]
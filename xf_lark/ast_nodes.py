@@ -42,6 +42,7 @@ class BinaryOpNode(TypedDict):
         "subtract",
         "multiply",
         "divide",
+        "modulus",
         "eq",
         "ne",
         "lt",
@@ -74,3 +75,6 @@ AnyASTNode: TypeAlias = (
 )
 
 ExpressionAST: TypeAlias = AnyASTNode
+
+# Location of a node within an AST: the keys and argument indexes leading to it
+ASTPath: TypeAlias = tuple[str | int, ...]
@@ -0,0 +1,246 @@
+from collections.abc import Iterable, Mapping, Sequence
+from itertools import repeat
+from operator import itemgetter
+
+from .ast_nodes import AnyASTNode, ExpressionAST
+from .evaluator import CompiledExpression, EvaluationContext, compile_expression
+from .functions import FUNCTIONS, XFValue, to_boolean, to_string
+
+ChoiceRow = Mapping[str, XFValue]
+
+_ROW_DEPENDENT_NODE_TYPES = frozenset(["bare_variable_ref", "current_ref", "parent_ref"])
+
+
+def _is_row_independent(node: AnyASTNode) -> bool:
+    """True if the subtree can be evaluated once per filter, not once per choice row."""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        node_type = current["type"]
+        if node_type in _ROW_DEPENDENT_NODE_TYPES:
+            return False
+        if node_type == "unary_op":
+            stack.append(current["operand"])
+        elif node_type == "binary_op":
+            stack.append(current["left"])
+            stack.append(current["right"])
+        elif node_type == "function_call":
+            function = FUNCTIONS.get(current["name"])
+            if function is None or function.needs_context:
+                return False
+            stack.extend(current["arguments"])
+    return True
+
+
+def _flatten_conjunction(ast: ExpressionAST) -> list[AnyASTNode]:
+    conjuncts: list[AnyASTNode] = []
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if node["type"] == "binary_op" and node["operator"] == "and":
+            stack.append(node["right"])
+            stack.append(node["left"])
+        else:
+            conjuncts.append(node)
+    return conjuncts
+
+
+def _match_column_equality(node: AnyASTNode) -> tuple[str, AnyASTNode] | None:
+    """Matches `column = <row independent expression>` in either orientation."""
+    if node["type"] != "binary_op" or node["operator"] != "eq":
+        return None
+    for column_side, value_side in (
+        (node["left"], node["right"]),
+        (node["right"], node["left"]),
+    ):
+        if column_side["type"] == "bare_variable_ref" and _is_row_independent(
+            value_side
+        ):
+            return column_side["name"], value_side
+    return None
+
+
+class _Lookup:
+    __slots__ = ("column", "value", "predicate")
+
+    def __init__(self, column: str, value_node: AnyASTNode, conjunct: AnyASTNode):
+        self.column: str = column
+        self.value: CompiledExpression = compile_expression(value_node)
+        # Used instead of the index when the value is not compared as a string
+        self.predicate: CompiledExpression = compile_expression(conjunct)
+
+
+class ChoiceFilterPlan:
+    """
+    A `choice_filter` expression split into index lookups and a residual predicate.
+
+    Each conjunct of the form `column = <expression not depending on the choice
+    row>` becomes a lookup into a hash index on that column. The remaining
+    conjuncts are evaluated on the rows selected by the lookups. Expressions with
+    no such conjunct (e.g. a top-level `or`) are answered with a full scan.
+    """
+
+    def __init__(self, ast: ExpressionAST):
+        self.ast: ExpressionAST = ast
+        self.lookups: list[_Lookup] = []
+        residual_conjuncts: list[AnyASTNode] = []
+
+        for conjunct in _flatten_conjunction(ast):
+            match = _match_column_equality(conjunct)
+            if match is None:
+                residual_conjuncts.append(conjunct)
+            else:
+                column, value_node = match
+                self.lookups.append(_Lookup(column, value_node, conjunct))
+
+        self.lookups.sort(key=lambda lookup: lookup.column)
+        self.columns: tuple[str, ...] = tuple(
+            lookup.column for lookup in self.lookups
+        )
+        self.residual: list[CompiledExpression] = [
+            compile_expression(conjunct) for conjunct in residual_conjuncts
+        ]
+        self.full_scan: CompiledExpression = compile_expression(ast)
+
+    @property
+    def is_indexed(self) -> bool:
+        return bool(self.lookups)
+
+
+def plan_choice_filter(ast: ExpressionAST) -> ChoiceFilterPlan:
+    return ChoiceFilterPlan(ast)
+
+
+def _lookup_keys(value: XFValue) -> list[str] | None:
+    """
+    The index keys equal to a lookup value, or None when XPath would not compare
+    it as a string (numbers, booleans, dates) and the row must be checked instead.
+    """
+    if value is None or isinstance(value, str):
+        return [to_string(value)]
+    if isinstance(value, (list, tuple)):
+        keys = [_lookup_keys(item) for item in value]
+        if any(key is None for key in keys):
+            return None
+        return [key for item_keys in keys for key in item_keys]
+    return None
+
+
+class ChoiceIndex:
+    """
+    Hash indexes over the columns of a choice list, built lazily once per
+    combination of columns used by a filter plan and reused across evaluations.
+
+    Cells are indexed by their string value, as read from the choices sheet.
+    Rows with a cell of another type (e.g. a number, which XPath compares
+    numerically) in an indexed column are left out of the index and always
+    checked against the lookup predicates instead.
+    """
+
+    def __init__(self, choices: Sequence[ChoiceRow]):
+        self.choices: Sequence[ChoiceRow] = choices
+        self._indexes: dict[tuple[str, ...], dict[tuple[str, ...], list[int]]] = {}
+        self._unindexed: dict[tuple[str, ...], list[int]] = {}
+
+    def index_on(self, columns: tuple[str, ...]) -> dict[tuple[str, ...], list[int]]:
+        index = self._indexes.get(columns)
+        if index is None:
+            index = {}
+            unindexed: list[int] = []
+            for position, row in enumerate(self.choices):
+                cells = [row.get(column) for column in columns]
+                if all(cell is None or isinstance(cell, str) for cell in cells):
+                    key = tuple(to_string(cell) for cell in cells)
+                    index.setdefault(key, []).append(position)
+                else:
+                    unindexed.append(position)
+            self._indexes[columns] = index
+            self._unindexed[columns] = unindexed
+        return index
+
+    def _candidates(
+        self, plan: ChoiceFilterPlan, context: EvaluationContext
+    ) -> tuple[Sequence[int], list[CompiledExpression], list[int], list[CompiledExpression]]:
+        """
+        Returns the positions selected by the index with the predicates they
+        still need, and the rows left out of the index with theirs.
+        """
+        indexed_lookups: list[_Lookup] = []
+        key_options: list[list[str]] = []
+        deferred: list[CompiledExpression] = []
+
+        for lookup in plan.lookups:
+            keys = _lookup_keys(lookup.value(context))
+            if keys is None:
+                deferred.append(lookup.predicate)
+            else:
+                indexed_lookups.append(lookup)
+                key_options.append(keys)
+
+        if not indexed_lookups:
+            return range(len(self.choices)), deferred, [], []
+
+        columns = tuple(lookup.column for lookup in indexed_lookups)
+        index = self.index_on(columns)
+        unindexed = self._unindexed[columns]
+        unindexed_predicates = deferred + [lookup.predicate for lookup in indexed_lookups]
+
+        composite_keys: list[tuple[str, ...]] = [()]
+        for keys in key_options:
+            composite_keys = [prefix + (key,) for prefix in composite_keys for key in keys]
+
+        if len(composite_keys) == 1:
+            return index.get(composite_keys[0], []), deferred, unindexed, unindexed_predicates
+        positions: set[int] = set()
+        for key in composite_keys:
+            positions.update(index.get(key, ()))
+        return sorted(positions), deferred, unindexed, unindexed_predicates
+
+    def filter(
+        self, plan: ChoiceFilterPlan, context: EvaluationContext | None = None
+    ) -> list[ChoiceRow]:
+        """Returns the choice rows for which the plan's expression is true, in order."""
+        base_context: EvaluationContext = context or {}
+        choices = self.choices
+
+        if not plan.is_indexed:
+            predicates = [plan.full_scan]
+            positions: Sequence[int] = range(len(choices))
+            unindexed: list[int] = []
+            unindexed_predicates: list[CompiledExpression] = []
+        else:
+            positions, deferred, unindexed, unindexed_predicates = self._candidates(
+                plan, base_context
+            )
+            predicates = plan.residual + deferred
+            unindexed_predicates = plan.residual + unindexed_predicates
+
+        if not predicates and not unindexed:
+            return [choices[position] for position in positions]
+
+        checked: Iterable[tuple[int, list[CompiledExpression]]] = zip(
+            positions, repeat(predicates)
+        )
+        if unindexed:
+            checked = sorted(
+                [*checked, *zip(unindexed, repeat(unindexed_predicates))],
+                key=itemgetter(0),
+            )
+
+        selected: list[ChoiceRow] = []
+        row_context: EvaluationContext = dict(base_context)  # pyright: ignore[reportAssignmentType]
+        for position, checks in checked:
+            row = choices[position]
+            row_context["node"] = row
+            if all(to_boolean(predicate(row_context)) for predicate in checks):
+                selected.append(row)
+        return selected
+
+
+def filter_choices(
+    ast: ExpressionAST,
+    choices: Sequence[ChoiceRow],
+    context: EvaluationContext | None = None,
+) -> list[ChoiceRow]:
+    """One-shot convenience wrapper; reuse a ChoiceIndex and plan for repeated filtering."""
+    return ChoiceIndex(choices).filter(plan_choice_filter(ast), context)
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import zlib
+from collections.abc import Mapping
+from typing import Literal, TypedDict
+
+from .ast_nodes import ExpressionAST
+from .fingerprint import fingerprint
+from .parser import XFParser
+from .traversal import walk
+
+PostingKind = Literal["variable", "function", "operator"]
+
+
+class CorpusMatch(TypedDict):
+    form: str
+    expression: str  # expression key within the form, e.g. "age.constraint"
+    source: str
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forms (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS expressions (
+    id INTEGER PRIMARY KEY,
+    form_id INTEGER NOT NULL REFERENCES forms(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    ast BLOB NOT NULL,
+    UNIQUE (form_id, key)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expression_id INTEGER NOT NULL REFERENCES expressions(id) ON DELETE CASCADE,
+    PRIMARY KEY (kind, key, expression_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_expression ON postings(expression_id);
+"""
+
+
+def _encode_ast(ast: ExpressionAST) -> bytes:
+    return zlib.compress(json.dumps(ast, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode_ast(data: bytes) -> ExpressionAST:
+    return json.loads(zlib.decompress(data))
+
+
+def _postings(ast: ExpressionAST) -> set[tuple[PostingKind, str]]:
+    """The distinct variables, functions and operators an AST refers to."""
+    postings: set[tuple[PostingKind, str]] = set()
+    for node in walk(ast):
+        node_type = node["type"]
+        if node_type == "variable_ref":
+            postings.add(("variable", node["name"]))
+        elif node_type in ("unary_op", "binary_op"):
+            postings.add(("operator", node["operator"]))
+        elif node_type == "function_call":
+            postings.add(("function", node["name"]))
+    return postings
+
+
+class CorpusStore:
+    """
+    Parsed expressions of many forms in a single SQLite file, with inverted
+    indexes from variable names (`${name}`), function names and operators
+    (e.g. "and", "divide") to the expressions that use them.
+
+    ASTs are stored as zlib-compressed JSON next to their source text and
+    fingerprint. Replacing a form only re-parses expressions whose source
+    changed and only rewrites postings for expressions whose fingerprint
+    changed, all in one transaction.
+    """
+
+    def __init__(self, path: str | os.PathLike[str] = ":memory:", parser: XFParser | None = None):
+        self.parser: XFParser = parser or XFParser()
+        self._connection: sqlite3.Connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "CorpusStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def put_form(self, form: str, expressions: Mapping[str, str]) -> None:
+        """
+        Adds a form, or replaces the stored version of it. `expressions` maps
+        an expression key (e.g. "age.constraint") to its source text.
+        Nothing is written if any expression fails to parse.
+        """
+        connection = self._connection
+        row = connection.execute("SELECT id FROM forms WHERE name = ?", (form,)).fetchone()
+        stored: dict[str, tuple[int, str, str]] = {}
+        if row is not None:
+            stored = {
+                key: (expression_id, source, stored_fingerprint)
+                for expression_id, key, source, stored_fingerprint in connection.execute(
+                    "SELECT id, key, source, fingerprint FROM expressions WHERE form_id = ?",
+                    (row[0],),
+                )
+            }
+
+        # Parse before writing, so a syntax error leaves the store untouched
+        changed: dict[str, tuple[str, ExpressionAST, str]] = {}
+        for key, source in expressions.items():
+            if key in stored and stored[key][1] == source:
+                continue
+            ast = self.parser.parse(source)
+            changed[key] = (source, ast, fingerprint(ast))
+
+        with connection:
+            if row is None:
+                form_id = connection.execute(
+                    "INSERT INTO forms (name) VALUES (?)", (form,)
+                ).lastrowid
+            else:
+                form_id = row[0]
+
+            removed = [stored[key][0] for key in stored if key not in expressions]
+            connection.executemany(
+                "DELETE FROM expressions WHERE id = ?", [(i,) for i in removed]
+            )
+
+            for key, (source, ast, new_fingerprint) in changed.items():
+                if key in stored:
+                    expression_id, _, old_fingerprint = stored[key]
+                    connection.execute(
+                        "UPDATE expressions SET source = ?, fingerprint = ?, ast = ? WHERE id = ?",
+                        (source, new_fingerprint, _encode_ast(ast), expression_id),
+                    )
+                    if old_fingerprint == new_fingerprint:
+                        continue
+                    connection.execute(
+                        "DELETE FROM postings WHERE expression_id = ?", (expression_id,)
+                    )
+                else:
+                    expression_id = connection.execute(
+                        "INSERT INTO expressions (form_id, key, source, fingerprint, ast)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (form_id, key, source, new_fingerprint, _encode_ast(ast)),
+                    ).lastrowid
+                connection.executemany(
+                    "INSERT INTO postings (kind, key, expression_id) VALUES (?, ?, ?)",
+                    [(kind, name, expression_id) for kind, name in sorted(_postings(ast))],
+                )
+
+    def remove_form(self, form: str) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM forms WHERE name = ?", (form,))
+
+    def forms(self) -> list[str]:
+        return [
+            name for (name,) in self._connection.execute("SELECT name FROM forms ORDER BY name")
+        ]
+
+    def get_ast(self, form: str, expression: str) -> ExpressionAST:
+        row = self._connection.execute(
+            "SELECT e.ast FROM expressions e JOIN forms f ON f.id = e.form_id"
+            " WHERE f.name = ? AND e.key = ?",
+            (form, expression),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No expression {expression!r} in form {form!r}")
+        return _decode_ast(row[0])
+
+    def find(self, kind: PostingKind, key: str) -> list[CorpusMatch]:
+        """Every stored expression that uses the given variable, function or operator."""
+        return [
+            {"form": form, "expression": expression, "source": source}
+            for form, expression, source in self._connection.execute(
+                "SELECT f.name, e.key, e.source FROM postings p"
+                " JOIN expressions e ON e.id = p.expression_id"
+                " JOIN forms f ON f.id = e.form_id"
+                " WHERE p.kind = ? AND p.key = ?"
+                " ORDER BY f.name, e.key",
+                (kind, key),
+            )
+        ]
+
+    def find_variable(self, name: str) -> list[CorpusMatch]:
+        return self.find("variable", name)
+
+    def find_function(self, name: str) -> list[CorpusMatch]:
+        return self.find("function", name)
+
+    def find_operator(self, operator: str) -> list[CorpusMatch]:
+        return self.find("operator", operator)
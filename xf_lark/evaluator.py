@@ -0,0 +1,278 @@
+import math
+import operator
+from collections.abc import Callable, Mapping
+from typing import Any, TypeAlias, TypedDict
+
+from .ast_nodes import AnyASTNode, ExpressionAST
+from .functions import (
+    UNBOUND,
+    XFValue,
+    compare,
+    get_function,
+    to_boolean,
+    to_number,
+)
+from .repeats import AGGREGATE_FUNCTIONS, RepeatColumn
+from .traversal import children, walk
+from .type_inference import FUNCTION_SIGNATURES, InferredTypes, infer_types
+
+
+class EvaluationContext(TypedDict, total=False):
+    values: Mapping[str, XFValue]  # `${name}` references
+    node: Mapping[str, XFValue]  # bare `name` references, e.g. a choice row
+    current: XFValue  # `.`
+    parent: XFValue  # `..`
+    position: int  # `position()`
+    pulldata: Mapping[str, Any]  # `pulldata()` sources by name, see pulldata.PulldataSource
+    repeats: Mapping[str, RepeatColumn]  # repeat group fields, shadowing `values`
+
+
+CompiledExpression: TypeAlias = Callable[[EvaluationContext], XFValue]
+
+_EMPTY: Mapping[str, XFValue] = {}
+
+
+def _divide(left: float, right: float) -> float:
+    if right == 0:
+        if left == 0 or math.isnan(left):
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1.0, right)
+    return left / right
+
+
+def _modulus(left: float, right: float) -> float:
+    # Like math.fmod, the result has the sign of the dividend
+    if right == 0 or math.isinf(left):
+        return math.nan
+    return math.fmod(left, right)
+
+
+_ARITHMETIC: dict[str, Callable[[float, float], float]] = {
+    "add": operator.add,
+    "subtract": operator.sub,
+    "multiply": operator.mul,
+    "divide": _divide,
+    "modulus": _modulus,
+}
+
+_COMPARISONS: dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "gt": operator.gt,
+    "lte": operator.le,
+    "gte": operator.ge,
+}
+
+
+class _Constant:
+    """A compiled subexpression whose value is known at compile time."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: XFValue):
+        self.value: XFValue = value
+
+    def __call__(self, _context: EvaluationContext) -> XFValue:
+        return self.value
+
+
+class _Compiler:
+    def __init__(self, types: InferredTypes):
+        self.types: InferredTypes = types
+
+    def is_number(self, node: AnyASTNode) -> bool:
+        return self.types.type_of(node) == "number"
+
+    def compile(self, ast: ExpressionAST) -> CompiledExpression:
+        """Compiles children before parents, with an explicit stack."""
+        compiled: dict[int, CompiledExpression] = {}
+        for node in walk(ast, order="post"):
+            compiled[id(node)] = self.compile_node(
+                node, [compiled[id(child)] for child in children(node)]
+            )
+        return compiled[id(ast)]
+
+    def compile_node(
+        self, node: AnyASTNode, compiled_children: list[CompiledExpression]
+    ) -> CompiledExpression:
+        node_type = node["type"]
+
+        if node_type in ("number_literal", "string_literal"):
+            return _Constant(node["value"])
+
+        if node_type == "variable_ref":
+            return self.compile_variable_ref(node)
+
+        if node_type == "bare_variable_ref":
+            name = node["name"]
+            return lambda context: context.get("node", _EMPTY).get(name)
+
+        if node_type == "current_ref":
+            return lambda context: context.get("current")
+
+        if node_type == "parent_ref":
+            return lambda context: context.get("parent")
+
+        if node_type == "unary_op":
+            return self.compile_unary_op(node, *compiled_children)
+
+        if node_type == "binary_op":
+            return self.compile_binary_op(node, *compiled_children)
+
+        if node_type == "function_call":
+            return self.compile_function_call(node, compiled_children)
+
+        raise ValueError(f"Cannot evaluate node of type {node_type!r}")
+
+    def compile_variable_ref(self, node) -> CompiledExpression:
+        name = node["name"]
+
+        def variable_ref(context: EvaluationContext) -> XFValue:
+            # Fields inside a repeat group evaluate to the node-set of their values,
+            # taking precedence over `values` as in `compile_aggregate`
+            repeats = context.get("repeats")
+            if repeats is not None:
+                column = repeats.get(name)
+                if column is not None:
+                    return column.values
+            return context.get("values", _EMPTY).get(name)
+
+        return variable_ref
+
+    def compile_aggregate(self, node, fallback: CompiledExpression) -> CompiledExpression:
+        """`sum(${field})` and friends, answered by the repeat column when there is one."""
+        name = node["name"]
+        field = node["arguments"][0]["name"]
+
+        def aggregate(context: EvaluationContext) -> XFValue:
+            repeats = context.get("repeats")
+            if repeats is not None:
+                column = repeats.get(field)
+                if column is not None:
+                    return column.aggregate(name)
+            return fallback(context)
+
+        return aggregate
+
+    def compile_unary_op(self, node, operand: CompiledExpression) -> CompiledExpression:
+        if isinstance(operand, _Constant):
+            return _Constant(-to_number(operand.value))
+        if self.is_number(node["operand"]):
+            return lambda context: -operand(context)
+        return lambda context: -to_number(operand(context))
+
+    def compile_binary_op(
+        self, node, left: CompiledExpression, right: CompiledExpression
+    ) -> CompiledExpression:
+        operator_name = node["operator"]
+
+        if operator_name == "and":
+            compiled = lambda context: to_boolean(left(context)) and to_boolean(
+                right(context)
+            )
+        elif operator_name == "or":
+            compiled = lambda context: to_boolean(left(context)) or to_boolean(
+                right(context)
+            )
+        elif operator_name in _ARITHMETIC:
+            arithmetic = _ARITHMETIC[operator_name]
+            if self.is_number(node["left"]) and self.is_number(node["right"]):
+                # Both sides are statically numbers: skip the coercions
+                compiled = lambda context: arithmetic(left(context), right(context))
+            else:
+                compiled = lambda context: arithmetic(
+                    to_number(left(context)), to_number(right(context))
+                )
+        elif operator_name in _COMPARISONS:
+            comparison = _COMPARISONS[operator_name]
+            if self.is_number(node["left"]) and self.is_number(node["right"]):
+                compiled = lambda context: comparison(left(context), right(context))
+            else:
+                numeric = operator_name not in ("eq", "ne")
+                compiled = lambda context: compare(
+                    comparison, left(context), right(context), numeric
+                )
+        else:
+            raise ValueError(f"Unknown binary operator {operator_name!r}")
+
+        if isinstance(left, _Constant) and isinstance(right, _Constant):
+            return _Constant(compiled({}))
+        return compiled
+
+    def compile_function_call(
+        self, node, arguments: list[CompiledExpression]
+    ) -> CompiledExpression:
+        name: str = node["name"]
+        function = get_function(name)
+        signature = FUNCTION_SIGNATURES.get(name)
+        arity = len(node["arguments"])
+        if signature is not None and (
+            arity < signature["min_args"]
+            or (signature["max_args"] is not None and arity > signature["max_args"])
+        ):
+            raise ValueError(f"Wrong number of arguments for {name}(): {arity}")
+
+        all_constant = all(isinstance(argument, _Constant) for argument in arguments)
+
+        if name == "if":
+            condition, value_if_true, value_if_false = arguments
+            if isinstance(condition, _Constant):
+                return value_if_true if to_boolean(condition.value) else value_if_false
+            return lambda context: (
+                value_if_true(context)
+                if to_boolean(condition(context))
+                else value_if_false(context)
+            )
+
+        impl = function.impl
+        if function.prebind is not None:
+            literal_values = tuple(
+                argument.value if isinstance(argument, _Constant) else UNBOUND
+                for argument in arguments
+            )
+            impl = function.prebind(literal_values) or impl
+
+        if function.needs_context:
+            return lambda context: impl(
+                context, *[argument(context) for argument in arguments]
+            )
+
+        if all_constant and function.pure:
+            return _Constant(impl(*[argument.value for argument in arguments]))
+
+        if arity == 0:
+            return lambda context: impl()
+        if arity == 1:
+            (only,) = arguments
+            compiled = lambda context: impl(only(context))
+            if (
+                name in AGGREGATE_FUNCTIONS
+                and node["arguments"][0]["type"] == "variable_ref"
+            ):
+                return self.compile_aggregate(node, compiled)
+            return compiled
+        if arity == 2:
+            first, second = arguments
+            return lambda context: impl(first(context), second(context))
+        return lambda context: impl(*[argument(context) for argument in arguments])
+
+
+def compile_expression(ast: ExpressionAST) -> CompiledExpression:
+    """
+    Compiles an AST into a Python callable taking an `EvaluationContext`.
+
+    Literal subexpressions are folded, literal function arguments are pre-bound
+    (e.g. regex patterns and date formats), and operators whose operands are
+    statically known to be numbers skip XPath coercions.
+
+    Compiling handles ASTs of any depth, but the compiled expression calls one
+    Python function per nesting level, so evaluating an expression nested
+    more deeply than the recursion limit raises RecursionError. Bound the
+    depth of untrusted expressions with ParseLimits.
+    """
+    return _Compiler(infer_types(ast)).compile(ast)
+
+
+def evaluate(ast: ExpressionAST, context: EvaluationContext | None = None) -> XFValue:
+    return compile_expression(ast)(context or {})
@@ -0,0 +1,242 @@
+import hashlib
+from collections.abc import Mapping
+from typing import Literal, TypedDict
+
+from .ast_nodes import AnyASTNode, ASTPath, ExpressionAST
+from .traversal import children
+
+FINGERPRINT_SIZE = 16  # bytes
+
+
+class ASTChange(TypedDict):
+    kind: Literal["added", "removed", "replaced"]
+    old_path: ASTPath | None
+    new_path: ASTPath | None
+    old: AnyASTNode | None
+    new: AnyASTNode | None
+
+
+class ExpressionSetDiff(TypedDict):
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+    unchanged: list[str]
+
+
+def _label(node: AnyASTNode) -> str:
+    """Everything that identifies a node apart from its children."""
+    node_type = node["type"]
+    if node_type == "number_literal":
+        return f"number_literal:{float(node['value'])!r}"
+    if node_type == "string_literal":
+        return f"string_literal:{node['value']}"
+    if node_type in ("variable_ref", "bare_variable_ref"):
+        return f"{node_type}:{node['name']}"
+    if node_type in ("unary_op", "binary_op"):
+        return f"{node_type}:{node['operator']}"
+    if node_type == "function_call":
+        return f"function_call:{node['name']}:{len(node['arguments'])}"
+    return node_type
+
+
+def _digest(label: str, child_fingerprints: list[str]) -> str:
+    hasher = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    encoded_label = label.encode("utf-8")
+    # Length-prefixed so that no two different nodes share an encoding
+    hasher.update(len(encoded_label).to_bytes(4, "little"))
+    hasher.update(encoded_label)
+    for child_fingerprint in child_fingerprints:
+        hasher.update(bytes.fromhex(child_fingerprint))
+    return hasher.hexdigest()
+
+
+def fingerprint_tree(ast: ExpressionAST) -> dict[int, str]:
+    """
+    Computes the structural fingerprint of every node of an AST, keyed by node
+    identity. Each node is hashed once, children before parents.
+    """
+    fingerprints: dict[int, str] = {}
+    stack: list[tuple[AnyASTNode, bool]] = [(ast, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            fingerprints[id(node)] = _digest(
+                _label(node), [fingerprints[id(child)] for child in children(node)]
+            )
+            continue
+        stack.append((node, True))
+        for child in reversed(children(node)):
+            stack.append((child, False))
+    return fingerprints
+
+
+def fingerprint(ast: ExpressionAST) -> str:
+    """
+    A stable hex digest of an AST's structure. Expressions that parse to the
+    same AST (differing only in whitespace, quote style or redundant
+    parentheses) share a fingerprint, across processes and versions.
+    """
+    return fingerprint_tree(ast)[id(ast)]
+
+
+def _align(old: list[str], new: list[str]) -> list[tuple[int | None, int | None]]:
+    """Aligns two fingerprint lists on their longest common subsequence."""
+    lengths = [[0] * (len(new) + 1) for _ in range(len(old) + 1)]
+    for i in range(len(old) - 1, -1, -1):
+        for j in range(len(new) - 1, -1, -1):
+            if old[i] == new[j]:
+                lengths[i][j] = lengths[i + 1][j + 1] + 1
+            else:
+                lengths[i][j] = max(lengths[i + 1][j], lengths[i][j + 1])
+
+    pairs: list[tuple[int | None, int | None]] = []
+    pending_old: list[int] = []
+    pending_new: list[int] = []
+
+    def flush() -> None:
+        # Unmatched runs between two matches are paired up positionally
+        for k in range(max(len(pending_old), len(pending_new))):
+            pairs.append(
+                (
+                    pending_old[k] if k < len(pending_old) else None,
+                    pending_new[k] if k < len(pending_new) else None,
+                )
+            )
+        pending_old.clear()
+        pending_new.clear()
+
+    i = j = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            flush()
+            pairs.append((i, j))
+            i += 1
+            j += 1
+        elif lengths[i + 1][j] >= lengths[i][j + 1]:
+            pending_old.append(i)
+            i += 1
+        else:
+            pending_new.append(j)
+            j += 1
+    pending_old.extend(range(i, len(old)))
+    pending_new.extend(range(j, len(new)))
+    flush()
+    return pairs
+
+
+def diff_ast(old: ExpressionAST, new: ExpressionAST) -> list[ASTChange]:
+    """
+    Lists the smallest subtrees that differ between two ASTs.
+
+    Subtrees with equal fingerprints are skipped without being walked. Nodes
+    with the same label are descended into; function arguments are aligned so
+    that an inserted or deleted argument is reported as "added" or "removed"
+    rather than as a change of every following argument. Anything else is
+    reported as "replaced".
+    """
+    old_fingerprints = fingerprint_tree(old)
+    new_fingerprints = fingerprint_tree(new)
+    changes: list[ASTChange] = []
+    stack: list[tuple[AnyASTNode, AnyASTNode, ASTPath, ASTPath]] = [(old, new, (), ())]
+
+    while stack:
+        old_node, new_node, old_path, new_path = stack.pop()
+        if old_fingerprints[id(old_node)] == new_fingerprints[id(new_node)]:
+            continue
+
+        same_kind = old_node["type"] == new_node["type"] and (
+            old_node["type"] == "function_call"
+            and old_node["name"] == new_node["name"]
+            or old_node["type"] in ("unary_op", "binary_op")
+            and old_node["operator"] == new_node["operator"]
+        )
+        if not same_kind:
+            changes.append(
+                {
+                    "kind": "replaced",
+                    "old_path": old_path,
+                    "new_path": new_path,
+                    "old": old_node,
+                    "new": new_node,
+                }
+            )
+            continue
+
+        node_type = old_node["type"]
+        if node_type == "unary_op":
+            stack.append(
+                (
+                    old_node["operand"],
+                    new_node["operand"],
+                    old_path + ("operand",),
+                    new_path + ("operand",),
+                )
+            )
+        elif node_type == "binary_op":
+            for key in ("right", "left"):
+                stack.append(
+                    (old_node[key], new_node[key], old_path + (key,), new_path + (key,))
+                )
+        else:
+            old_arguments = old_node["arguments"]
+            new_arguments = new_node["arguments"]
+            pairs = _align(
+                [old_fingerprints[id(argument)] for argument in old_arguments],
+                [new_fingerprints[id(argument)] for argument in new_arguments],
+            )
+            for old_index, new_index in reversed(pairs):
+                old_argument_path = (
+                    None if old_index is None else old_path + ("arguments", old_index)
+                )
+                new_argument_path = (
+                    None if new_index is None else new_path + ("arguments", new_index)
+                )
+                if old_index is None:
+                    changes.append(
+                        {
+                            "kind": "added",
+                            "old_path": None,
+                            "new_path": new_argument_path,
+                            "old": None,
+                            "new": new_arguments[new_index],
+                        }
+                    )
+                elif new_index is None:
+                    changes.append(
+                        {
+                            "kind": "removed",
+                            "old_path": old_argument_path,
+                            "new_path": None,
+                            "old": old_arguments[old_index],
+                            "new": None,
+                        }
+                    )
+                else:
+                    stack.append(
+                        (
+                            old_arguments[old_index],
+                            new_arguments[new_index],
+                            old_argument_path,
+                            new_argument_path,
+                        )
+                    )
+    return changes
+
+
+def diff_expressions(
+    old: Mapping[str, ExpressionAST], new: Mapping[str, ExpressionAST]
+) -> ExpressionSetDiff:
+    """
+    Compares two versions of a form's expressions, keyed by name (e.g.
+    "age.constraint"), so only the added and changed ones need re-processing.
+    """
+    result: ExpressionSetDiff = {"added": [], "removed": [], "changed": [], "unchanged": []}
+    for key, new_ast in new.items():
+        if key not in old:
+            result["added"].append(key)
+        elif fingerprint(old[key]) == fingerprint(new_ast):
+            result["unchanged"].append(key)
+        else:
+            result["changed"].append(key)
+    result["removed"] = [key for key in old if key not in new]
+    return result
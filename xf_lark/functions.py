@@ -0,0 +1,696 @@
+import datetime
+import functools
+import math
+import random
+import re
+import secrets
+import string
+import sys
+import uuid
+from collections.abc import Callable, Iterable, Mapping
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any, TypeAlias
+
+XFValue: TypeAlias = Any
+FunctionImpl: TypeAlias = Callable[..., XFValue]
+Prebinder: TypeAlias = Callable[[tuple[XFValue, ...]], FunctionImpl | None]
+
+# Placeholder for non-literal arguments passed to a prebinder.
+UNBOUND = object()
+
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+_EPOCH_DATETIME = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_SECONDS_PER_DAY = 86400.0
+
+REGEX_CACHE_SIZE = 256
+DATE_CACHE_SIZE = 4096
+DATE_FORMAT_CACHE_SIZE = 128
+
+
+class XFFunction:
+    """
+    A registered XLSForm function.
+
+    `pure` functions may be evaluated at compile time when all their arguments
+    are literals. `needs_context` functions receive the evaluation context as
+    their first argument. `prebind`, when set, is called at compile time with
+    the literal argument values (and `UNBOUND` for the others) and may return a
+    specialized implementation with the same signature.
+    """
+
+    __slots__ = ("name", "impl", "pure", "needs_context", "prebind")
+
+    def __init__(
+        self,
+        name: str,
+        impl: FunctionImpl,
+        pure: bool = True,
+        needs_context: bool = False,
+        prebind: Prebinder | None = None,
+    ):
+        self.name: str = name
+        self.impl: FunctionImpl = impl
+        self.pure: bool = pure
+        self.needs_context: bool = needs_context
+        self.prebind: Prebinder | None = prebind
+
+    def __call__(self, *args: XFValue) -> XFValue:
+        return self.impl(*args)
+
+
+FUNCTIONS: dict[str, XFFunction] = {}
+
+
+def register(
+    name: str,
+    pure: bool = True,
+    needs_context: bool = False,
+    prebind: Prebinder | None = None,
+) -> Callable[[FunctionImpl], FunctionImpl]:
+    """Registers an implementation under an XLSForm function name."""
+
+    def decorator(impl: FunctionImpl) -> FunctionImpl:
+        FUNCTIONS[name] = XFFunction(
+            name, impl, pure=pure, needs_context=needs_context, prebind=prebind
+        )
+        return impl
+
+    return decorator
+
+
+def get_function(name: str) -> XFFunction:
+    try:
+        return FUNCTIONS[name]
+    except KeyError:
+        raise ValueError(f"Unknown function: {name}()") from None
+
+
+# --- Coercions (XPath 1.0 semantics, with ODK date handling) ---
+
+
+_NUMBER_PATTERN = re.compile(r"^\s*-?(?:\d+(?:\.\d*)?|\.\d+)\s*$")
+
+
+def _is_nodeset(value: XFValue) -> bool:
+    return isinstance(value, (list, tuple))
+
+
+def _first(value: XFValue) -> XFValue:
+    return value[0] if value else None
+
+
+def to_number(value: XFValue) -> float:
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        if _NUMBER_PATTERN.match(value):
+            return float(value)
+        parsed = parse_date_string(value.strip())
+        return math.nan if parsed is None else _date_to_days(parsed)
+    if isinstance(value, datetime.date):
+        return _date_to_days(value)
+    if _is_nodeset(value):
+        return to_number(_first(value)) if value else math.nan
+    return math.nan
+
+
+def format_number(number: float) -> str:
+    if math.isnan(number):
+        return "NaN"
+    if math.isinf(number):
+        return "Infinity" if number > 0 else "-Infinity"
+    if number.is_integer():
+        return str(int(number))
+    return repr(number)
+
+
+def to_string(value: XFValue) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return format_number(float(value))
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(timespec="milliseconds")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if _is_nodeset(value):
+        return to_string(_first(value))
+    return str(value)
+
+
+def to_boolean(value: XFValue) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0 and not math.isnan(value)
+    if value is None:
+        return False
+    if isinstance(value, (str, list, tuple)):
+        return len(value) > 0
+    return True
+
+
+def to_date(value: XFValue) -> datetime.date | None:
+    if isinstance(value, datetime.date):
+        return value
+    if _is_nodeset(value):
+        return to_date(_first(value))
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        if math.isnan(value) or math.isinf(value):
+            return None
+        try:
+            return _EPOCH_DATETIME + datetime.timedelta(days=value)
+        except OverflowError:
+            # Outside the years 1 to 9999
+            return None
+    return parse_date_string(to_string(value).strip())
+
+
+def _date_to_days(value: datetime.date) -> float:
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return (value - _EPOCH_DATETIME).total_seconds() / _SECONDS_PER_DAY
+    return float((value - _EPOCH_DATE).days)
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_string(text: str) -> datetime.date | None:
+    """Parses an ISO 8601 date or date-time string. Results are cached."""
+    if not text or not text[0].isdigit():
+        return None
+    try:
+        if len(text) == 10:
+            return datetime.date.fromisoformat(text)
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=REGEX_CACHE_SIZE)
+def compile_regex(pattern: str) -> re.Pattern[str]:
+    return re.compile(pattern)
+
+
+# --- Comparisons ---
+
+
+def _compare_atoms(operator: Callable[[Any, Any], bool], left, right, numeric: bool) -> bool:
+    if numeric:
+        return operator(to_number(left), to_number(right))
+    if isinstance(left, bool) or isinstance(right, bool):
+        return operator(to_boolean(left), to_boolean(right))
+    if isinstance(left, (int, float, datetime.date)) or isinstance(
+        right, (int, float, datetime.date)
+    ):
+        return operator(to_number(left), to_number(right))
+    return operator(to_string(left), to_string(right))
+
+
+def compare(operator: Callable[[Any, Any], bool], left, right, numeric: bool) -> bool:
+    """
+    Compares two values the way XPath does: node-sets compare existentially,
+    `=`/`!=` prefer boolean, then number, then string comparison, and
+    `<`/`>`/`<=`/`>=` (`numeric=True`) always compare numbers.
+    """
+    if _is_nodeset(left):
+        return any(compare(operator, item, right, numeric) for item in left)
+    if _is_nodeset(right):
+        return any(compare(operator, left, item, numeric) for item in right)
+    return _compare_atoms(operator, left, right, numeric)
+
+
+# --- Boolean functions ---
+
+
+@register("true")
+def xf_true() -> bool:
+    return True
+
+
+@register("false")
+def xf_false() -> bool:
+    return False
+
+
+@register("not")
+def xf_not(value) -> bool:
+    return not to_boolean(value)
+
+
+@register("boolean")
+def xf_boolean(value) -> bool:
+    return to_boolean(value)
+
+
+@register("boolean-from-string")
+def xf_boolean_from_string(value) -> bool:
+    return to_string(value) in ("true", "1")
+
+
+@register("selected")
+def xf_selected(selection, value) -> bool:
+    return to_string(value) in to_string(selection).split()
+
+
+def _prebind_regex(args: tuple[XFValue, ...]) -> FunctionImpl | None:
+    pattern = args[1] if len(args) == 2 else UNBOUND
+    if pattern is UNBOUND:
+        return None
+    compiled = compile_regex(to_string(pattern))
+    return lambda value, _pattern: compiled.search(to_string(value)) is not None
+
+
+@register("regex", prebind=_prebind_regex)
+def xf_regex(value, pattern) -> bool:
+    return compile_regex(to_string(pattern)).search(to_string(value)) is not None
+
+
+@register("contains")
+def xf_contains(haystack, needle) -> bool:
+    return to_string(needle) in to_string(haystack)
+
+
+@register("starts-with")
+def xf_starts_with(value, prefix) -> bool:
+    return to_string(value).startswith(to_string(prefix))
+
+
+@register("ends-with")
+def xf_ends_with(value, suffix) -> bool:
+    return to_string(value).endswith(to_string(suffix))
+
+
+# --- Number functions ---
+
+
+@register("number")
+def xf_number(value) -> float:
+    return to_number(value)
+
+
+@register("int")
+def xf_int(value) -> float:
+    number = to_number(value)
+    if math.isnan(number) or math.isinf(number):
+        return number
+    return float(math.trunc(number))
+
+
+@register("round")
+def xf_round(value, digits=None) -> float:
+    number = to_number(value)
+    if math.isnan(number) or math.isinf(number):
+        return number
+    if digits is None:
+        return float(math.floor(number + 0.5))
+    places = to_number(digits)
+    if math.isnan(places):
+        return math.nan
+    # Doubles have no digits beyond 10^-400, and every double rounds to 0 at 10^400
+    if places > 400:
+        return number
+    if places < -400:
+        return 0.0
+    try:
+        quantum = Decimal(1).scaleb(-int(places))
+        return float(Decimal(repr(number)).quantize(quantum, rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        return number
+
+
+@register("floor")
+def xf_floor(value) -> float:
+    number = to_number(value)
+    return number if math.isnan(number) or math.isinf(number) else float(math.floor(number))
+
+
+@register("ceiling")
+def xf_ceiling(value) -> float:
+    number = to_number(value)
+    return number if math.isnan(number) or math.isinf(number) else float(math.ceil(number))
+
+
+@register("abs")
+def xf_abs(value) -> float:
+    return abs(to_number(value))
+
+
+@register("pow")
+def xf_pow(base, exponent) -> float:
+    base_number, exponent_number = to_number(base), to_number(exponent)
+    try:
+        return math.pow(base_number, exponent_number)
+    except OverflowError:
+        negative = base_number < 0 and exponent_number % 2 == 1
+        return -math.inf if negative else math.inf
+    except ValueError:
+        # 0 to a negative power, or a negative base to a fractional power
+        return math.inf if base_number == 0 else math.nan
+
+
+def _math_function(
+    function: Callable[[float], float], at_zero: float | None = None
+) -> FunctionImpl:
+    """Wraps a math function to return Infinity on overflow and NaN outside its domain."""
+
+    def impl(value) -> float:
+        number = to_number(value)
+        if at_zero is not None and number == 0:
+            return at_zero
+        try:
+            return function(number)
+        except OverflowError:
+            return math.inf
+        except ValueError:
+            return math.nan
+
+    return impl
+
+
+register("sqrt")(_math_function(math.sqrt))
+register("exp")(_math_function(math.exp))
+register("exp10")(_math_function(lambda number: math.pow(10.0, number)))
+register("log")(_math_function(math.log, at_zero=-math.inf))
+register("log10")(_math_function(math.log10, at_zero=-math.inf))
+
+
+@register("pi")
+def xf_pi() -> float:
+    return math.pi
+
+
+@register("random", pure=False)
+def xf_random() -> float:
+    return random.random()
+
+
+def _iter_nodes(value) -> Iterable[XFValue]:
+    if _is_nodeset(value):
+        return value
+    if value is None:
+        return ()
+    return (value,)
+
+
+@register("count")
+def xf_count(nodeset) -> float:
+    return float(sum(1 for _ in _iter_nodes(nodeset)))
+
+
+@register("count-non-empty")
+def xf_count_non_empty(nodeset) -> float:
+    return float(sum(1 for node in _iter_nodes(nodeset) if to_string(node) != ""))
+
+
+@register("count-selected")
+def xf_count_selected(selection) -> float:
+    return float(len(to_string(selection).split()))
+
+
+@register("sum")
+def xf_sum(nodeset) -> float:
+    return math.fsum(to_number(node) for node in _iter_nodes(nodeset))
+
+
+def _numbers(arguments: tuple[XFValue, ...]) -> list[float]:
+    return [to_number(node) for argument in arguments for node in _iter_nodes(argument)]
+
+
+@register("max")
+def xf_max(*arguments) -> float:
+    numbers = _numbers(arguments)
+    if not numbers or any(math.isnan(number) for number in numbers):
+        return math.nan
+    return max(numbers)
+
+
+@register("min")
+def xf_min(*arguments) -> float:
+    numbers = _numbers(arguments)
+    if not numbers or any(math.isnan(number) for number in numbers):
+        return math.nan
+    return min(numbers)
+
+
+@register("position", needs_context=True)
+def xf_position(context: Mapping[str, Any], _node=None) -> float:
+    return float(context.get("position", math.nan))
+
+
+@register("decimal-date-time")
+def xf_decimal_date_time(value) -> float:
+    date = to_date(value)
+    return math.nan if date is None else _date_to_days(date)
+
+
+_TIME_PATTERN = re.compile(r"^(\d{2}):(\d{2})(?::(\d{2}(?:\.\d+)?))?")
+
+
+@register("decimal-time")
+def xf_decimal_time(value) -> float:
+    match = _TIME_PATTERN.match(to_string(value))
+    if match is None:
+        return math.nan
+    hours, minutes, seconds = match.groups()
+    total = int(hours) * 3600 + int(minutes) * 60 + float(seconds or 0)
+    return total / _SECONDS_PER_DAY
+
+
+# --- String functions ---
+
+
+@register("string", needs_context=True)
+def xf_string(context: Mapping[str, Any], *arguments) -> str:
+    return to_string(arguments[0] if arguments else context.get("current"))
+
+
+@register("string-length", needs_context=True)
+def xf_string_length(context: Mapping[str, Any], *arguments) -> float:
+    return float(len(xf_string(context, *arguments)))
+
+
+@register("normalize-space", needs_context=True)
+def xf_normalize_space(context: Mapping[str, Any], *arguments) -> str:
+    return " ".join(xf_string(context, *arguments).split())
+
+
+@register("concat")
+def xf_concat(*arguments) -> str:
+    return "".join(to_string(argument) for argument in arguments)
+
+
+@register("join")
+def xf_join(separator, nodeset) -> str:
+    return to_string(separator).join(to_string(node) for node in _iter_nodes(nodeset))
+
+
+def _slice_index(number: float) -> int:
+    # Infinite indexes clamp to the ends of the string
+    return int(max(-sys.maxsize, min(number, sys.maxsize)))
+
+
+@register("substr")
+def xf_substr(value, start, end=None) -> str:
+    text = to_string(value)
+    start_index = to_number(start)
+    if math.isnan(start_index):
+        return ""
+    if end is None:
+        return text[_slice_index(start_index) :]
+    end_index = to_number(end)
+    if math.isnan(end_index):
+        return ""
+    return text[_slice_index(start_index) : _slice_index(end_index)]
+
+
+@register("substring-before")
+def xf_substring_before(value, separator) -> str:
+    text, found, _ = to_string(value).partition(to_string(separator))
+    return text if found else ""
+
+
+@register("substring-after")
+def xf_substring_after(value, separator) -> str:
+    _, found, remainder = to_string(value).partition(to_string(separator))
+    return remainder if found else ""
+
+
+@register("translate")
+def xf_translate(value, from_chars, to_chars) -> str:
+    source, target = to_string(from_chars), to_string(to_chars)
+    table = {
+        ord(character): (target[i] if i < len(target) else None)
+        for i, character in reversed(list(enumerate(source)))
+    }
+    return to_string(value).translate(table)
+
+
+@register("selected-at")
+def xf_selected_at(selection, index) -> str:
+    position = to_number(index)
+    choices = to_string(selection).split()
+    if math.isnan(position) or not 0 <= position < len(choices):
+        return ""
+    return choices[int(position)]
+
+
+_UUID_ALPHABET = string.ascii_letters + string.digits
+
+
+@register("uuid", pure=False)
+def xf_uuid(length=None) -> str:
+    if length is None:
+        return str(uuid.uuid4())
+    size = to_number(length)
+    if math.isnan(size) or math.isinf(size) or size < 0:
+        return ""
+    return "".join(secrets.choice(_UUID_ALPHABET) for _ in range(int(size)))
+
+
+# --- Date functions ---
+
+
+_MONTH_NAMES = [
+    "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
+]  # fmt: skip
+_DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+_DATE_FIELDS: dict[str, Callable[[datetime.datetime], str]] = {
+    "Y": lambda d: f"{d.year:04d}",
+    "y": lambda d: f"{d.year % 100:02d}",
+    "m": lambda d: f"{d.month:02d}",
+    "n": lambda d: str(d.month),
+    "b": lambda d: _MONTH_NAMES[d.month - 1],
+    "d": lambda d: f"{d.day:02d}",
+    "e": lambda d: str(d.day),
+    "H": lambda d: f"{d.hour:02d}",
+    "h": lambda d: str(d.hour),
+    "M": lambda d: f"{d.minute:02d}",
+    "S": lambda d: f"{d.second:02d}",
+    "3": lambda d: f"{d.microsecond // 1000:03d}",
+    "a": lambda d: _DAY_NAMES[d.weekday()],
+}
+
+
+@functools.lru_cache(maxsize=DATE_FORMAT_CACHE_SIZE)
+def compile_date_format(
+    date_format: str,
+) -> tuple[str | Callable[[datetime.datetime], str], ...]:
+    """Splits an ODK date format (e.g. "%Y-%m-%d") into literals and field getters."""
+    parts: list[str | Callable[[datetime.datetime], str]] = []
+    literal: list[str] = []
+    i = 0
+    while i < len(date_format):
+        character = date_format[i]
+        if character == "%" and i + 1 < len(date_format):
+            field = _DATE_FIELDS.get(date_format[i + 1])
+            if field is not None:
+                if literal:
+                    parts.append("".join(literal))
+                    literal = []
+                parts.append(field)
+                i += 2
+                continue
+        literal.append(character)
+        i += 1
+    if literal:
+        parts.append("".join(literal))
+    return tuple(parts)
+
+
+def _format_date(value, parts) -> str:
+    date = to_date(value)
+    if date is None:
+        return ""
+    if not isinstance(date, datetime.datetime):
+        date = datetime.datetime(date.year, date.month, date.day)
+    return "".join(part if isinstance(part, str) else part(date) for part in parts)
+
+
+def _prebind_format_date(args: tuple[XFValue, ...]) -> FunctionImpl | None:
+    date_format = args[1] if len(args) == 2 else UNBOUND
+    if date_format is UNBOUND:
+        return None
+    parts = compile_date_format(to_string(date_format))
+    return lambda value, _date_format: _format_date(value, parts)
+
+
+@register("format-date", prebind=_prebind_format_date)
+def xf_format_date(value, date_format) -> str:
+    return _format_date(value, compile_date_format(to_string(date_format)))
+
+
+@register("format-date-time", prebind=_prebind_format_date)
+def xf_format_date_time(value, date_format) -> str:
+    return _format_date(value, compile_date_format(to_string(date_format)))
+
+
+@register("today", pure=False)
+def xf_today() -> datetime.date:
+    return datetime.date.today()
+
+
+@register("now", pure=False)
+def xf_now() -> datetime.datetime:
+    return datetime.datetime.now().astimezone()
+
+
+@register("date")
+def xf_date(value) -> datetime.date | str:
+    date = to_date(value)
+    if date is None:
+        return ""
+    if isinstance(date, datetime.datetime):
+        return date.date()
+    return date
+
+
+@register("date-time")
+def xf_date_time(value) -> datetime.date | str:
+    date = to_date(value)
+    return "" if date is None else date
+
+
+# --- Control and context functions ---
+
+
+@register("if")
+def xf_if(condition, value_if_true, value_if_false):
+    return value_if_true if to_boolean(condition) else value_if_false
+
+
+@register("coalesce")
+def xf_coalesce(first, second):
+    return first if to_string(first) != "" else second
+
+
+@register("once", needs_context=True)
+def xf_once(context: Mapping[str, Any], value):
+    current = context.get("current")
+    return value if to_string(current) == "" else current
+
+
+@register("pulldata", needs_context=True)
+def xf_pulldata(context: Mapping[str, Any], instance, value_column, key_column, key) -> str:
+    sources = context.get("pulldata", {})
+    name = to_string(instance)
+    try:
+        source = sources[name]
+    except KeyError:
+        raise ValueError(f"No pulldata source named {name!r}") from None
+    return source.lookup(to_string(value_column), to_string(key_column), to_string(key))
+
+
+@register("current", needs_context=True)
+def xf_current(context: Mapping[str, Any]):
+    return context.get("current")
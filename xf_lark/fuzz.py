@@ -0,0 +1,371 @@
+import math
+import random
+import string
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from typing import Literal, TypedDict
+
+from lark import Lark, Tree
+from lark.exceptions import LarkError
+from lark.grammar import NonTerminal, Symbol
+from lark.lexer import PatternStr
+
+from .parser import XFParser, get_lark_parser
+
+_KEYWORDS = frozenset(["and", "or", "div", "mod"])
+_NAME_START = string.ascii_letters + "_"
+_NAME_CHARS = string.ascii_letters + string.digits + "_-"
+_STRING_CHARS = string.ascii_letters + string.digits + " _-.,:;/$%&()[]{}<>=!+*"
+
+
+def _sample_name(rng: random.Random) -> str:
+    while True:
+        name = rng.choice(_NAME_START) + "".join(
+            rng.choice(_NAME_CHARS) for _ in range(rng.randrange(8))
+        )
+        if name not in _KEYWORDS:
+            return name
+
+
+def _sample_number(rng: random.Random) -> str:
+    shape = rng.randrange(4)
+    if shape == 0:
+        return str(rng.randrange(1000))
+    if shape == 1:
+        return f"{rng.randrange(1000)}.{rng.randrange(1000)}"
+    if shape == 2:
+        return f".{rng.randrange(1000)}"
+    return f"{rng.randrange(1, 10)}e{rng.choice(['', '+', '-'])}{rng.randrange(20)}"
+
+
+def _sample_string(rng: random.Random) -> str:
+    quote = rng.choice("'\"")
+    other = "\"'"[quote == '"']
+    body = "".join(rng.choice(_STRING_CHARS + other) for _ in range(rng.randrange(12)))
+    return quote + body + quote
+
+
+def _sample_variable(rng: random.Random) -> str:
+    return "${" + _sample_name(rng) + rng.choice(["", ".x", "_1"]) + "}"
+
+
+# Samplers for the grammar's regex terminals; literal terminals are written as is
+_TERMINAL_SAMPLERS: dict[str, Callable[[random.Random], str]] = {
+    "NUMBER": _sample_number,
+    "NAME": _sample_name,
+    "STRING": _sample_string,
+    "VARIABLE": _sample_variable,
+}
+
+
+class ExpressionGenerator:
+    """
+    Random expressions derived from the rules of grammar.lark.
+
+    Rules are expanded at random until `max_depth` rule expansions deep or
+    `max_tokens` tokens long, after which every rule takes its shallowest
+    expansion so the expression closes off. The same seed always gives the
+    same sequence of expressions.
+    """
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        max_depth: int = 24,
+        max_tokens: int = 64,
+        lark_parser: Lark | None = None,
+    ):
+        self.rng: random.Random = random.Random(seed)
+        self.max_depth: int = max_depth
+        self.max_tokens: int = max_tokens
+
+        lark_parser = lark_parser or get_lark_parser()
+        self.start: NonTerminal = NonTerminal(lark_parser.options.start[0])
+        self.expansions: dict[Symbol, list[list[Symbol]]] = {}
+        for rule in lark_parser.rules:
+            self.expansions.setdefault(rule.origin, []).append(list(rule.expansion))
+
+        self.literals: dict[str, str] = {}
+        for terminal in lark_parser.terminals:
+            if isinstance(terminal.pattern, PatternStr):
+                self.literals[terminal.name] = terminal.pattern.value
+            elif terminal.name not in _TERMINAL_SAMPLERS and terminal.name not in (
+                lark_parser.ignore_tokens
+            ):
+                raise ValueError(f"No sampler for grammar terminal {terminal.name}")
+
+        self.heights: dict[Symbol, int] = self._expansion_heights()
+        self.shallowest: dict[Symbol, list[list[Symbol]]] = {
+            symbol: [
+                expansion
+                for expansion in expansions
+                if self._height(expansion) == self.heights[symbol]
+            ]
+            for symbol, expansions in self.expansions.items()
+        }
+
+    def _height(self, expansion: list[Symbol]) -> int:
+        return 1 + max(
+            (self.heights.get(symbol, 0) for symbol in expansion if not symbol.is_term),
+            default=0,
+        )
+
+    def _expansion_heights(self) -> dict[Symbol, int]:
+        """The least number of nested rule expansions each rule needs to end."""
+        self.heights = {}
+        changed = True
+        while changed:
+            changed = False
+            for symbol, expansions in self.expansions.items():
+                for expansion in expansions:
+                    if any(
+                        not child.is_term and child not in self.heights
+                        for child in expansion
+                    ):
+                        continue
+                    height = self._height(expansion)
+                    if height < self.heights.get(symbol, math.inf):
+                        self.heights[symbol] = height
+                        changed = True
+        return self.heights
+
+    def terminal_text(self, name: str) -> str:
+        if name in self.literals:
+            return self.literals[name]
+        return _TERMINAL_SAMPLERS[name](self.rng)
+
+    def tokens(self) -> list[str]:
+        tokens: list[str] = []
+        stack: list[tuple[Symbol, int]] = [(self.start, 0)]
+        while stack:
+            symbol, depth = stack.pop()
+            if symbol.is_term:
+                tokens.append(self.terminal_text(symbol.name))
+                continue
+            if depth >= self.max_depth or len(tokens) + len(stack) >= self.max_tokens:
+                expansion = self.rng.choice(self.shallowest[symbol])
+            else:
+                expansion = self.rng.choice(self.expansions[symbol])
+            stack.extend((child, depth + 1) for child in reversed(expansion))
+        return tokens
+
+    def expression(self) -> str:
+        return " ".join(self.tokens())
+
+    def mutate(self, tokens: list[str]) -> list[str]:
+        """
+        Applies one random token-level edit: deleting, duplicating, swapping,
+        inserting or replacing a token, or truncating. The result is usually,
+        but not always, invalid.
+        """
+        tokens = list(tokens)
+        position = self.rng.randrange(len(tokens))
+        literal = self.rng.choice(sorted(self.literals.values()))
+        mutation = self.rng.randrange(6)
+        if mutation == 0:
+            del tokens[position]
+        elif mutation == 1:
+            tokens.insert(position, tokens[position])
+        elif mutation == 2 and len(tokens) > 1:
+            other = position - 1 if position else 1
+            tokens[position], tokens[other] = tokens[other], tokens[position]
+        elif mutation == 3:
+            tokens.insert(position, literal)
+        elif mutation == 4:
+            tokens[position] = literal
+        else:
+            tokens = tokens[:position]
+        return tokens
+
+    def near_valid_expression(self) -> str:
+        return " ".join(self.mutate(self.tokens()))
+
+
+# Input shapes whose size grows linearly with n, used to check parser scaling
+SCALING_FAMILIES: dict[str, Callable[[int], str]] = {
+    "concat_arguments": lambda n: "concat(" + ", ".join(f"'{i}'" for i in range(n)) + ")",
+    "nested_parentheses": lambda n: "(" * n + "1" + ")" * n,
+    "unary_minus_chain": lambda n: "-" * n + "1",
+    "additive_chain": lambda n: " + ".join(["${a}"] * n),
+    "logical_chain": lambda n: " and ".join(["${a} = 1"] * n),
+    "nested_calls": lambda n: "if(" * n + "1" + ", 2, 3)" * n,
+}
+
+
+class ParseMeasurement(TypedDict):
+    size: int  # characters
+    seconds: float  # fastest of the repeats
+    peak_bytes: int  # peak traced allocation while parsing
+    error: str | None
+
+
+class ScalingReport(TypedDict):
+    family: str
+    measurements: list[ParseMeasurement]
+    time_exponent: float
+    memory_exponent: float
+    super_linear: bool
+
+
+class FuzzCrash(TypedDict):
+    expression: str
+    # exception: anything other than a lark syntax error was raised
+    # rejected: a grammar-generated expression failed to parse
+    # malformed: the result is not made only of AST node dicts
+    kind: Literal["exception", "rejected", "malformed"]
+    error: str
+
+
+class FuzzReport(TypedDict):
+    expressions: int
+    parsed: int
+    rejected: int  # near-valid expressions rejected with a syntax error, as expected
+    crashes: list[FuzzCrash]
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+def _foreign_value(value: object) -> object | None:
+    """The first value in a parse result that is not part of a plain AST, if any."""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict) and isinstance(item.get("type"), str):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        elif not isinstance(item, (str, float, int)):
+            return item
+    return None
+
+
+def measure_parse(parser: XFParser, expression: str, repeats: int = 3) -> ParseMeasurement:
+    """
+    Times parsing `expression` (best of `repeats`, with perf_counter) and then
+    measures its peak memory in a separate run, so tracing does not skew the
+    timing. Errors of any kind are recorded rather than raised.
+    """
+    seconds = math.inf
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            parser.parse(expression)
+            seconds = min(seconds, time.perf_counter() - start)
+    except Exception as error:
+        return {"size": len(expression), "seconds": seconds, "peak_bytes": 0, "error": _describe(error)}
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        parser.parse(expression)
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {"size": len(expression), "seconds": seconds, "peak_bytes": peak_bytes, "error": None}
+
+
+def growth_exponent(sizes: Iterable[float], values: Iterable[float]) -> float:
+    """
+    The least-squares slope of log(value) against log(size): about 1 for
+    linear growth, 2 for quadratic.
+    """
+    points = [
+        (math.log(size), math.log(value))
+        for size, value in zip(sizes, values)
+        if size > 0 and value > 0
+    ]
+    if len(points) < 2:
+        return math.nan
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return math.nan
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def scaling_run(
+    parser: XFParser,
+    family: str,
+    sizes: Iterable[int],
+    repeats: int = 3,
+    threshold: float = 1.3,
+) -> ScalingReport:
+    """
+    Parses one of SCALING_FAMILIES at each of `sizes` and fits how time and
+    memory grow with input length. Growth with an exponent above `threshold`
+    in either is flagged as super-linear. Sizes that fail to parse are kept
+    in `measurements` with their error and left out of the fit.
+    """
+    make_expression = SCALING_FAMILIES[family]
+    measurements = [measure_parse(parser, make_expression(n), repeats) for n in sizes]
+    successful = [m for m in measurements if m["error"] is None]
+    time_exponent = growth_exponent(
+        [m["size"] for m in successful], [m["seconds"] for m in successful]
+    )
+    memory_exponent = growth_exponent(
+        [m["size"] for m in successful], [m["peak_bytes"] for m in successful]
+    )
+    return {
+        "family": family,
+        "measurements": measurements,
+        "time_exponent": time_exponent,
+        "memory_exponent": memory_exponent,
+        "super_linear": time_exponent > threshold or memory_exponent > threshold,
+    }
+
+
+def fuzz(
+    parser: XFParser,
+    iterations: int = 1000,
+    seed: int | None = None,
+    near_valid_ratio: float = 0.5,
+    max_depth: int = 24,
+    max_tokens: int = 64,
+) -> FuzzReport:
+    """
+    Parses `iterations` generated expressions, a `near_valid_ratio` share of
+    them mutated, and collects every crash: an exception other than a lark
+    syntax error, a valid expression being rejected, or a result that is not
+    a plain AST.
+    """
+    generator = ExpressionGenerator(seed, max_depth=max_depth, max_tokens=max_tokens)
+    report: FuzzReport = {"expressions": iterations, "parsed": 0, "rejected": 0, "crashes": []}
+    for _ in range(iterations):
+        tokens = generator.tokens()
+        near_valid = generator.rng.random() < near_valid_ratio
+        expression = " ".join(generator.mutate(tokens) if near_valid else tokens)
+        try:
+            ast = parser.parse(expression)
+        except LarkError as error:
+            if near_valid:
+                report["rejected"] += 1
+            else:
+                report["crashes"].append(
+                    {"expression": expression, "kind": "rejected", "error": _describe(error)}
+                )
+            continue
+        except Exception as error:
+            report["crashes"].append(
+                {"expression": expression, "kind": "exception", "error": _describe(error)}
+            )
+            continue
+        foreign = _foreign_value(ast)
+        if foreign is None:
+            report["parsed"] += 1
+        else:
+            if isinstance(foreign, Tree):
+                error = f"untransformed Tree({foreign.data!r}) in AST"
+            else:
+                error = f"{type(foreign).__name__} in AST"
+            report["crashes"].append(
+                {"expression": expression, "kind": "malformed", "error": error}
+            )
+    return report
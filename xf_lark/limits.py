@@ -0,0 +1,60 @@
+import re
+from typing import TypedDict
+
+
+class ParseLimits(TypedDict, total=False):
+    max_length: int  # characters
+    max_tokens: int
+    # Nesting of parentheses (including function call parentheses), unary
+    # minus chains and binary operator chains such as `a and b and c`
+    max_depth: int
+    max_nodes: int  # AST nodes
+    timeout: float  # seconds of wall-clock time
+
+
+# A starting point for expressions from untrusted sources; real forms stay
+# far below these
+UNTRUSTED_INPUT_LIMITS: ParseLimits = {
+    "max_length": 10_000,
+    "max_tokens": 2_000,
+    "max_depth": 64,
+    "max_nodes": 2_000,
+    "timeout": 1.0,
+}
+
+
+class ParseLimitExceeded(ValueError):
+    """
+    Raised when parsing is abandoned because an expression exceeds one of its
+    ParseLimits. `limit` names the ParseLimits key; `position` is the
+    character offset parsing had reached, if it had started.
+    """
+
+    def __init__(self, limit: str, maximum: float, position: int | None = None):
+        self.limit: str = limit
+        self.maximum: float = maximum
+        self.position: int | None = position
+        where = "" if position is None else f" at position {position}"
+        super().__init__(f"Expression exceeds {limit}={maximum}{where}")
+
+
+_STRING_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"")
+_PARENTHESES_PATTERN = re.compile(r"[()]")
+
+
+def prescan(expression: str, limits: ParseLimits) -> None:
+    """
+    Rejects expressions that are too long, or whose parentheses nest too
+    deeply, without tokenizing them. Runs in one regex pass over the text.
+    """
+    max_length = limits.get("max_length")
+    if max_length is not None and len(expression) > max_length:
+        raise ParseLimitExceeded("max_length", max_length)
+
+    max_depth = limits.get("max_depth")
+    if max_depth is not None:
+        depth = 0
+        for match in _PARENTHESES_PATTERN.finditer(_STRING_PATTERN.sub("", expression)):
+            depth += 1 if match.group() == "(" else -1
+            if depth > max_depth:
+                raise ParseLimitExceeded("max_depth", max_depth)
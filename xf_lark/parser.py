@@ -1,11 +1,75 @@
 import importlib.resources
+import time
 
 from lark import Lark
 
+from .limits import ParseLimitExceeded, ParseLimits, prescan
 from .transformer import AstTransformer
 
 _grammar_path_obj = importlib.resources.files(__package__) / "grammar.lark"
 
+# Token types after which a MINUS is a unary minus rather than a subtraction
+_OPERAND_EXPECTED = frozenset(
+    [
+        None,
+        "LPAR",
+        "COMMA",
+        "PLUS",
+        "MINUS",
+        "MUL",
+        "DIV",
+        "MOD",
+        "EQ",
+        "NE",
+        "LT",
+        "GT",
+        "LTE",
+        "GTE",
+        "AND",
+        "OR",
+    ]
+)
+# Tokens that don't become an AST node of their own
+_STRUCTURAL_TOKENS = frozenset(["LPAR", "RPAR", "COMMA"])
+# Binding strength of the binary operator tokens, as in the grammar
+_PRECEDENCE = {
+    "OR": 1,
+    "AND": 2,
+    "EQ": 3,
+    "NE": 3,
+    "LT": 3,
+    "GT": 3,
+    "LTE": 3,
+    "GTE": 3,
+    "PLUS": 4,
+    "MINUS": 4,
+    "MUL": 5,
+    "DIV": 5,
+    "MOD": 5,
+}
+
+
+def _close_spine(spine, height):
+    """
+    Returns the height of the operand formed by applying the pending binary
+    operators of `spine` to a right operand of the given height.
+    """
+    for _precedence, left_height in reversed(spine):
+        height = max(left_height, height) + 1
+    return height
+
+
+def _spine_depth(spine, height):
+    """
+    Returns the depth of the tree built so far at one parenthesis level: the
+    pending operators nest as right operands of each other, with the operand
+    being read at the bottom.
+    """
+    depth = len(spine) + height
+    for position, (_precedence, left_height) in enumerate(spine):
+        depth = max(depth, position + 1 + left_height)
+    return depth
+
 
 def get_lark_parser() -> Lark:
     with _grammar_path_obj.open("r", encoding="utf-8") as f:
@@ -22,7 +86,102 @@ class XFParser:
         self.lark_parser: Lark = get_lark_parser()
         self.ast_transformer: AstTransformer = AstTransformer()
 
-    def parse(self, expression_string: str):
-        parse_tree = self.lark_parser.parse(expression_string)
+    def parse(self, expression_string: str, limits: ParseLimits | None = None):
+        if limits is None:
+            parse_tree = self.lark_parser.parse(expression_string)
+        else:
+            parse_tree = self._parse_with_limits(expression_string, limits)
         ast = self.ast_transformer.transform(parse_tree)
         return ast
+
+    def _parse_with_limits(self, expression_string: str, limits: ParseLimits):
+        """
+        Parses token by token, raising ParseLimitExceeded as soon as the
+        tokens read so far exceed a limit.
+        """
+        deadline = None
+        if "timeout" in limits:
+            deadline = time.perf_counter() + limits["timeout"]
+        prescan(expression_string, limits)
+
+        max_tokens = limits.get("max_tokens")
+        max_depth = limits.get("max_depth")
+        max_nodes = limits.get("max_nodes")
+
+        token_count = 0
+        node_count = 0
+        # Unary minuses still applying at each open parenthesis level
+        unary_levels = [0]
+        # Binary operators still waiting for their right operand at each open
+        # parenthesis level, as (precedence, height of the left operand) pairs
+        # in increasing precedence, so at most one per precedence tier
+        spines = [[]]
+        # Height of the operand just read at each level
+        operand_heights = [0]
+        # Height of the tallest function argument already closed at each level
+        argument_heights = [0]
+        # Depth at which each open parenthesis level starts
+        base_depths = [0]
+        previous_type = None
+        token = None
+
+        interactive = self.lark_parser.parse_interactive(expression_string)
+        for token in interactive.iter_parse():
+            token_count += 1
+            token_type = token.type
+            if token_type == "LPAR":
+                base_depths.append(
+                    base_depths[-1] + len(spines[-1]) + unary_levels[-1] + 1
+                )
+                unary_levels.append(0)
+                spines.append([])
+                operand_heights.append(0)
+                argument_heights.append(0)
+            elif token_type == "RPAR":
+                if len(unary_levels) > 1:
+                    height = _close_spine(
+                        spines.pop(), operand_heights.pop() + unary_levels.pop()
+                    )
+                    height = max(height, argument_heights.pop()) + 1
+                    base_depths.pop()
+                    operand_heights[-1] = height
+            elif token_type == "MINUS" and previous_type in _OPERAND_EXPECTED:
+                unary_levels[-1] += 1
+            elif token_type in _OPERAND_EXPECTED:
+                # A binary operator or comma closes the operand unary minuses applied to
+                height = operand_heights[-1] + unary_levels[-1]
+                unary_levels[-1] = 0
+                operand_heights[-1] = 0
+                spine = spines[-1]
+                if token_type == "COMMA":
+                    # The next function argument starts a new operand
+                    argument_heights[-1] = max(
+                        argument_heights[-1], _close_spine(spine, height)
+                    )
+                    spine.clear()
+                else:
+                    # Operators of at least this precedence become the left
+                    # operand of this one, e.g. `a = 1` in `a = 1 and b = 2`
+                    precedence = _PRECEDENCE[token_type]
+                    while spine and spine[-1][0] >= precedence:
+                        height = max(spine.pop()[1], height) + 1
+                    spine.append((precedence, height))
+            else:
+                operand_heights[-1] = 0
+            if token_type not in _STRUCTURAL_TOKENS:
+                node_count += 1
+            previous_type = token_type
+
+            if max_tokens is not None and token_count > max_tokens:
+                raise ParseLimitExceeded("max_tokens", max_tokens, token.start_pos)
+            depth = base_depths[-1] + _spine_depth(
+                spines[-1], operand_heights[-1] + unary_levels[-1]
+            )
+            if max_depth is not None and depth > max_depth:
+                raise ParseLimitExceeded("max_depth", max_depth, token.start_pos)
+            if max_nodes is not None and node_count > max_nodes:
+                raise ParseLimitExceeded("max_nodes", max_nodes, token.start_pos)
+            if deadline is not None and time.perf_counter() > deadline:
+                raise ParseLimitExceeded("timeout", limits["timeout"], token.start_pos)
+
+        return interactive.feed_eof(token)
@@ -0,0 +1,277 @@
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections.abc import Iterator
+from contextlib import suppress
+from pathlib import Path
+
+from .ast_nodes import ExpressionAST
+from .functions import to_string
+
+_INDEX_MAGIC = b"XFPULLD1"
+# magic, CSV size, CSV mtime (ns), entry count
+_INDEX_HEADER = struct.Struct("<8sQQQ")
+# key hash, record offset in the CSV
+_INDEX_ENTRY = struct.Struct("<QQ")
+
+
+def _hash_key(key: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _parse_record(raw: bytes) -> list[str]:
+    text = raw.decode("utf-8").rstrip("\r\n")
+    return next(csv.reader([text]), [])
+
+
+class PulldataSource:
+    """
+    A CSV attachment queried by `pulldata()`.
+
+    The CSV is memory-mapped rather than loaded. For every key column that is
+    looked up, a sorted index of (key hash, record offset) pairs is built once
+    and stored next to the CSV (or in `index_dir`); it is memory-mapped as well
+    and searched by bisection, so a lookup touches only a few pages of each file.
+    Indexes are rebuilt when the CSV's size or modification time changes.
+
+    When the index directory is not writable, e.g. a read-only attachments
+    directory, indexes go to `fallback_dir` (by default a directory in the
+    system's temporary directory) instead.
+    """
+
+    def __init__(
+        self,
+        csv_path: str | os.PathLike[str],
+        index_dir: str | os.PathLike[str] | None = None,
+        fallback_dir: str | os.PathLike[str] | None = None,
+    ):
+        self.csv_path: Path = Path(csv_path)
+        self.index_dir: Path = Path(index_dir) if index_dir is not None else self.csv_path.parent
+        self.fallback_dir: Path = (
+            Path(fallback_dir)
+            if fallback_dir is not None
+            else Path(tempfile.gettempdir()) / "xf_lark-pulldata"
+        )
+        self._file = open(self.csv_path, "rb")
+        stat = os.fstat(self._file.fileno())
+        if stat.st_size == 0:
+            self._file.close()
+            raise ValueError(f"CSV file is empty: {self.csv_path}")
+        self._csv_size: int = stat.st_size
+        self._csv_mtime_ns: int = stat.st_mtime_ns
+        self._csv: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_raw, self._data_start = self._read_record(0)
+        header = _parse_record(header_raw)
+        if header and header[0].startswith("\ufeff"):
+            header[0] = header[0][1:]
+        self.columns: dict[str, int] = {name: i for i, name in enumerate(header)}
+        self._indexes: dict[str, tuple[mmap.mmap | None, int]] = {}
+
+    def __enter__(self) -> "PulldataSource":
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for index, _count in self._indexes.values():
+            if index is not None:
+                index.close()
+        self._indexes.clear()
+        self._csv.close()
+        self._file.close()
+
+    def _read_record(self, offset: int) -> tuple[bytes, int]:
+        """Reads the CSV record starting at `offset`, which may span several lines."""
+        csv_map = self._csv
+        end = offset
+        quotes = 0
+        while end < self._csv_size:
+            newline = csv_map.find(b"\n", end)
+            line_end = self._csv_size if newline == -1 else newline + 1
+            quotes += csv_map[end:line_end].count(b'"')
+            end = line_end
+            if quotes % 2 == 0:
+                break
+        return csv_map[offset:end], end
+
+    def _iter_records(self) -> Iterator[tuple[int, bytes]]:
+        offset = self._data_start
+        while offset < self._csv_size:
+            raw, next_offset = self._read_record(offset)
+            if raw.strip():
+                yield offset, raw
+            offset = next_offset
+
+    def _column_position(self, column: str) -> int:
+        try:
+            return self.columns[column]
+        except KeyError:
+            raise ValueError(f"Column {column!r} not found in {self.csv_path}") from None
+
+    def index_path(self, key_column: str) -> Path:
+        return self.index_dir / f"{self.csv_path.name}.{key_column}.idx"
+
+    def fallback_index_path(self, key_column: str) -> Path:
+        # CSVs of different directories share the fallback directory
+        digest = hashlib.blake2b(
+            os.fsencode(self.csv_path.resolve()), digest_size=8
+        ).hexdigest()
+        return self.fallback_dir / f"{digest}-{self.csv_path.name}.{key_column}.idx"
+
+    def _index_is_current(self, path: Path) -> bool:
+        try:
+            with open(path, "rb") as f:
+                header = f.read(_INDEX_HEADER.size)
+        except OSError:
+            return False
+        if len(header) != _INDEX_HEADER.size:
+            return False
+        magic, size, mtime_ns, _count = _INDEX_HEADER.unpack(header)
+        return (
+            magic == _INDEX_MAGIC
+            and size == self._csv_size
+            and mtime_ns == self._csv_mtime_ns
+        )
+
+    def build_index(self, key_column: str) -> Path:
+        """
+        Scans the CSV once and writes the sorted hash index for `key_column`,
+        returning its path.
+        """
+        position = self._column_position(key_column)
+        hashes = array("Q")
+        offsets = array("Q")
+        for offset, raw in self._iter_records():
+            fields = _parse_record(raw)
+            key = fields[position] if position < len(fields) else ""
+            hashes.append(_hash_key(key))
+            offsets.append(offset)
+
+        # Stable sort: among equal hashes the earliest record comes first, so the
+        # first matching row wins like in ODK Collect.
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        entries = bytearray(_INDEX_ENTRY.size * len(order))
+        for slot, i in enumerate(order):
+            _INDEX_ENTRY.pack_into(entries, slot * _INDEX_ENTRY.size, hashes[i], offsets[i])
+
+        header = _INDEX_HEADER.pack(
+            _INDEX_MAGIC, self._csv_size, self._csv_mtime_ns, len(order)
+        )
+        path = self.index_path(key_column)
+        try:
+            _write_atomically(path, header, entries)
+        except OSError:
+            path = self.fallback_index_path(key_column)
+            _write_atomically(path, header, entries)
+        return path
+
+    def prepare(self, key_column: str) -> None:
+        """Opens (building it first if missing or stale) the index for `key_column`."""
+        if key_column in self._indexes:
+            return
+        self._column_position(key_column)
+        path = self.index_path(key_column)
+        if not self._index_is_current(path):
+            fallback_path = self.fallback_index_path(key_column)
+            if self._index_is_current(fallback_path):
+                path = fallback_path
+            else:
+                path = self.build_index(key_column)
+        with open(path, "rb") as f:
+            _magic, _size, _mtime_ns, count = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+        self._indexes[key_column] = (index, count)
+
+    def lookup(self, value_column: str, key_column: str, key: str) -> str:
+        """Returns `value_column` of the first row whose `key_column` equals `key`, or ""."""
+        value_position = self._column_position(value_column)
+        key_position = self._column_position(key_column)
+        self.prepare(key_column)
+        index, count = self._indexes[key_column]
+        if index is None:
+            return ""
+
+        target = _hash_key(key)
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            (entry_hash,) = struct.unpack_from(
+                "<Q", index, _INDEX_HEADER.size + middle * _INDEX_ENTRY.size
+            )
+            if entry_hash < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        while low < count:
+            entry_hash, offset = _INDEX_ENTRY.unpack_from(
+                index, _INDEX_HEADER.size + low * _INDEX_ENTRY.size
+            )
+            if entry_hash != target:
+                break
+            fields = _parse_record(self._read_record(offset)[0])
+            if key_position < len(fields) and fields[key_position] == key:
+                return fields[value_position] if value_position < len(fields) else ""
+            low += 1
+        return ""
+
+
+def _write_atomically(path: Path, *chunks: bytes) -> None:
+    """
+    Writes a file through a uniquely named temporary file, so that processes
+    building the same index concurrently never see or corrupt a partial one.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        # mkstemp creates files readable by their owner only
+        os.chmod(temporary_name, 0o644)
+        os.replace(temporary_name, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(temporary_name)
+        raise
+
+
+def pulldata_calls(ast: ExpressionAST) -> list[tuple[str, str, str]]:
+    """
+    Lists the (instance name, value column, key column) triples of the
+    `pulldata()` calls in an AST whose first three arguments are literals, so
+    the matching sources and indexes can be prepared ahead of evaluation.
+    """
+    calls: list[tuple[str, str, str]] = []
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        node_type = node["type"]
+        if node_type == "unary_op":
+            stack.append(node["operand"])
+        elif node_type == "binary_op":
+            stack.append(node["right"])
+            stack.append(node["left"])
+        elif node_type == "function_call":
+            arguments = node["arguments"]
+            if (
+                node["name"] == "pulldata"
+                and len(arguments) == 4
+                and all(argument["type"] == "string_literal" for argument in arguments[:3])
+            ):
+                instance, value_column, key_column = (
+                    to_string(argument["value"]) for argument in arguments[:3]
+                )
+                calls.append((instance, value_column, key_column))
+            stack.extend(reversed(arguments))
+    return calls
@@ -0,0 +1,174 @@
+import math
+from array import array
+from collections.abc import Iterable, Mapping
+
+from .functions import XFValue, to_number, to_string
+
+
+class RepeatColumn:
+    """
+    The values of one field across all instances of a repeat group, stored
+    column-wise: raw values for node-set access, and their numeric values in a
+    contiguous float array.
+
+    `sum`, `count`, `max` and `min` are maintained incrementally as instances
+    are appended or edited. The sum is kept with Neumaier compensation; an edit
+    that removes the current maximum or minimum only marks it stale, and it is
+    recomputed in one pass over the array the next time it is read.
+    """
+
+    def __init__(self, values: Iterable[XFValue] = ()):
+        self.values: list[XFValue] = []
+        self.numbers: array[float] = array("d")
+        self._nan_count: int = 0
+        self._non_empty_count: int = 0
+        self._total: float = 0.0
+        self._compensation: float = 0.0
+        self._max: float = -math.inf
+        self._min: float = math.inf
+        self._extremes_stale: bool = False
+        for value in values:
+            self.append(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _add_to_total(self, number: float) -> None:
+        total = self._total + number
+        if abs(self._total) >= abs(number):
+            self._compensation += (self._total - total) + number
+        else:
+            self._compensation += (number - total) + self._total
+        self._total = total
+
+    def _count_in(self, value: XFValue, number: float) -> None:
+        if math.isnan(number):
+            self._nan_count += 1
+        else:
+            self._add_to_total(number)
+            if number > self._max:
+                self._max = number
+            if number < self._min:
+                self._min = number
+        if to_string(value) != "":
+            self._non_empty_count += 1
+
+    def _count_out(self, value: XFValue, number: float) -> None:
+        if math.isnan(number):
+            self._nan_count -= 1
+        else:
+            self._add_to_total(-number)
+            if number >= self._max or number <= self._min:
+                self._extremes_stale = True
+        if to_string(value) != "":
+            self._non_empty_count -= 1
+
+    def append(self, value: XFValue) -> None:
+        number = to_number(value)
+        self.values.append(value)
+        self.numbers.append(number)
+        self._count_in(value, number)
+
+    def set(self, index: int, value: XFValue) -> None:
+        self._count_out(self.values[index], self.numbers[index])
+        number = to_number(value)
+        self.values[index] = value
+        self.numbers[index] = number
+        self._count_in(value, number)
+
+    def remove(self, index: int) -> None:
+        self._count_out(self.values[index], self.numbers[index])
+        del self.values[index]
+        del self.numbers[index]
+
+    def _refresh_extremes(self) -> None:
+        if self._extremes_stale:
+            # Only called without NaNs, so the array can be scanned directly
+            self._max = max(self.numbers, default=-math.inf)
+            self._min = min(self.numbers, default=math.inf)
+            self._extremes_stale = False
+
+    def count(self) -> float:
+        return float(len(self.values))
+
+    def count_non_empty(self) -> float:
+        return float(self._non_empty_count)
+
+    def sum(self) -> float:
+        if self._nan_count:
+            return math.nan
+        return self._total + self._compensation
+
+    def max(self) -> float:
+        if self._nan_count or not self.values:
+            return math.nan
+        self._refresh_extremes()
+        return self._max
+
+    def min(self) -> float:
+        if self._nan_count or not self.values:
+            return math.nan
+        self._refresh_extremes()
+        return self._min
+
+    def aggregate(self, function_name: str) -> float:
+        return _AGGREGATES[function_name](self)
+
+
+_AGGREGATES = {
+    "sum": RepeatColumn.sum,
+    "count": RepeatColumn.count,
+    "count-non-empty": RepeatColumn.count_non_empty,
+    "max": RepeatColumn.max,
+    "min": RepeatColumn.min,
+}
+
+AGGREGATE_FUNCTIONS: frozenset[str] = frozenset(_AGGREGATES)
+
+
+class RepeatGroup:
+    """
+    The instances of a repeat group, stored as one RepeatColumn per field.
+
+    `columns` can be passed as the "repeats" key of an EvaluationContext (merge
+    several groups with collections.ChainMap); `sum(${field})`, `count(${field})`,
+    `count-non-empty(${field})`, `max(${field})` and `min(${field})` are then
+    answered from the columns instead of walking the instances.
+    """
+
+    def __init__(self, fields: Iterable[str] = ()):
+        self.columns: dict[str, RepeatColumn] = {field: RepeatColumn() for field in fields}
+        self.instance_count: int = 0
+
+    def add_instance(self, values: Mapping[str, XFValue]) -> int:
+        """Appends an instance and returns its index. Missing fields are empty."""
+        for field in values:
+            if field not in self.columns:
+                self.columns[field] = RepeatColumn([""] * self.instance_count)
+        for field, column in self.columns.items():
+            column.append(values.get(field, ""))
+        self.instance_count += 1
+        return self.instance_count - 1
+
+    def update_instance(self, index: int, values: Mapping[str, XFValue]) -> None:
+        """Sets the given fields of an existing instance."""
+        if not 0 <= index < self.instance_count:
+            raise IndexError(f"Repeat instance {index} does not exist")
+        for field, value in values.items():
+            if field not in self.columns:
+                self.columns[field] = RepeatColumn([""] * self.instance_count)
+            self.columns[field].set(index, value)
+
+    def remove_instance(self, index: int) -> None:
+        if not 0 <= index < self.instance_count:
+            raise IndexError(f"Repeat instance {index} does not exist")
+        for column in self.columns.values():
+            column.remove(index)
+        self.instance_count -= 1
+
+    def instance(self, index: int) -> dict[str, XFValue]:
+        return {field: column.values[index] for field, column in self.columns.items()}
+
+    def nodeset(self, field: str) -> list[XFValue]:
+        column = self.columns.get(field)
+        return [] if column is None else column.values
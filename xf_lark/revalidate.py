@@ -0,0 +1,347 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack, suppress
+from itertools import islice
+from typing import Literal, NotRequired, TypedDict
+
+from .ast_nodes import ExpressionAST
+from .evaluator import CompiledExpression, EvaluationContext, compile_expression
+from .functions import to_boolean, to_string
+from .parser import XFParser
+from .pulldata import PulldataSource, pulldata_calls
+
+
+class FieldRules(TypedDict, total=False):
+    column: str  # CSV column holding the field, defaults to the field name
+    relevant: str
+    required: str
+    constraint: str
+
+
+class Violation(TypedDict):
+    row: int  # 1-based data row number, excluding the header
+    field: str
+    # "error" when evaluating the expression raised
+    rule: Literal["required", "constraint", "error"]
+    value: str
+    expression: str
+    error: NotRequired[str]  # Exception type and message, for "error" violations
+
+
+class RevalidationReport(TypedDict):
+    rows: int
+    violations: int
+    seconds: float
+    rows_per_second: float
+
+
+class _ParsedRules(TypedDict, total=False):
+    column: str
+    relevant: ExpressionAST
+    required: ExpressionAST | bool
+    constraint: ExpressionAST
+    relevant_text: str
+    required_text: str
+    constraint_text: str
+
+
+class _CompiledRules(TypedDict, total=False):
+    column: str
+    relevant: CompiledExpression
+    required: CompiledExpression | bool
+    constraint: CompiledExpression
+    relevant_text: str
+    required_text: str
+    constraint_text: str
+
+
+# XLSForm accepts these words in the `required` column instead of an expression
+_REQUIRED_WORDS: dict[str, bool] = {
+    "yes": True,
+    "true": True,
+    "true()": True,
+    "no": False,
+    "false": False,
+    "false()": False,
+    "": False,
+}
+
+
+def parse_rules(fields: Mapping[str, FieldRules]) -> dict[str, _ParsedRules]:
+    """Parses every expression of the form once."""
+    parser = XFParser()
+    parsed: dict[str, _ParsedRules] = {}
+    for field, rules in fields.items():
+        field_rules: _ParsedRules = {"column": rules.get("column", field)}
+        if rules.get("relevant", "").strip():
+            field_rules["relevant"] = parser.parse(rules["relevant"])
+            field_rules["relevant_text"] = rules["relevant"]
+        required = rules.get("required", "").strip()
+        if required.lower() in _REQUIRED_WORDS:
+            field_rules["required"] = _REQUIRED_WORDS[required.lower()]
+        else:
+            field_rules["required"] = parser.parse(required)
+        field_rules["required_text"] = required
+        if rules.get("constraint", "").strip():
+            field_rules["constraint"] = parser.parse(rules["constraint"])
+            field_rules["constraint_text"] = rules["constraint"]
+        parsed[field] = field_rules
+    return parsed
+
+
+def _compile_rule(field: str, rule: str, ast: ExpressionAST, text: str) -> CompiledExpression:
+    # Compiling folds literal arguments, e.g. compiles the pattern of `regex(., '(')`
+    try:
+        return compile_expression(ast)
+    except Exception as error:
+        raise ValueError(
+            f"Cannot compile the {rule} expression of {field!r}, {text!r}: {error}"
+        ) from error
+
+
+def _compile_rules(parsed: Mapping[str, _ParsedRules]) -> dict[str, _CompiledRules]:
+    compiled: dict[str, _CompiledRules] = {}
+    for field, rules in parsed.items():
+        field_rules: _CompiledRules = {
+            "column": rules["column"],
+            "required_text": rules["required_text"],
+        }
+        if "relevant" in rules:
+            field_rules["relevant"] = _compile_rule(
+                field, "relevant", rules["relevant"], rules["relevant_text"]
+            )
+            field_rules["relevant_text"] = rules["relevant_text"]
+        required = rules["required"]
+        field_rules["required"] = (
+            required
+            if isinstance(required, bool)
+            else _compile_rule(field, "required", required, rules["required_text"])
+        )
+        if "constraint" in rules:
+            field_rules["constraint"] = _compile_rule(
+                field, "constraint", rules["constraint"], rules["constraint_text"]
+            )
+            field_rules["constraint_text"] = rules["constraint_text"]
+        compiled[field] = field_rules
+    return compiled
+
+
+def _check_rows(
+    rules: Mapping[str, _CompiledRules],
+    header: list[str],
+    rows: list[list[str]],
+    first_row_number: int,
+    pulldata: Mapping[str, PulldataSource] | None = None,
+) -> list[Violation]:
+    """
+    Evaluates the compiled rules against a chunk of CSV rows. An expression
+    that raises is reported as an "error" violation of its field and row
+    rather than aborting the run.
+    """
+    violations: list[Violation] = []
+    for row_number, row in enumerate(rows, start=first_row_number):
+        values = dict(zip(header, row))
+        for field, field_rules in rules.items():
+            column = field_rules["column"]
+            if column != field:
+                values[field] = values.get(column, "")
+
+        context: EvaluationContext = {"values": values}
+        if pulldata:
+            context["pulldata"] = pulldata
+        for field, field_rules in rules.items():
+            value = values.get(field, "")
+            context["current"] = value
+
+            rule = "relevant"
+            try:
+                relevant = field_rules.get("relevant")
+                if relevant is not None and not to_boolean(relevant(context)):
+                    continue
+
+                if value == "":
+                    rule = "required"
+                    required = field_rules["required"]
+                    if required is True or (
+                        not isinstance(required, bool) and to_boolean(required(context))
+                    ):
+                        violations.append(
+                            {
+                                "row": row_number,
+                                "field": field,
+                                "rule": "required",
+                                "value": value,
+                                "expression": field_rules["required_text"],
+                            }
+                        )
+                    continue
+
+                rule = "constraint"
+                constraint = field_rules.get("constraint")
+                if constraint is not None and not to_boolean(constraint(context)):
+                    violations.append(
+                        {
+                            "row": row_number,
+                            "field": field,
+                            "rule": "constraint",
+                            "value": to_string(value),
+                            "expression": field_rules["constraint_text"],
+                        }
+                    )
+            except Exception as error:
+                violations.append(
+                    {
+                        "row": row_number,
+                        "field": field,
+                        "rule": "error",
+                        "value": to_string(value),
+                        "expression": field_rules[f"{rule}_text"],
+                        "error": f"{type(error).__name__}: {error}",
+                    }
+                )
+    return violations
+
+
+def _open_pulldata(
+    parsed: Mapping[str, _ParsedRules],
+    paths: Mapping[str, str | os.PathLike[str]],
+    stack: ExitStack,
+) -> dict[str, PulldataSource]:
+    """
+    Opens the pulldata sources and builds the indexes the rules look up, so
+    that pool workers find them ready instead of racing to build them.
+    """
+    sources = {
+        name: stack.enter_context(PulldataSource(path)) for name, path in paths.items()
+    }
+    for rules in parsed.values():
+        for key in ("relevant", "required", "constraint"):
+            ast = rules.get(key)
+            if not isinstance(ast, dict):
+                continue
+            for instance, _value_column, key_column in pulldata_calls(ast):
+                if instance in sources:
+                    # Unknown columns are reported per row as "error" violations
+                    with suppress(ValueError):
+                        sources[instance].prepare(key_column)
+    return sources
+
+
+# Per-process state of pool workers, set once by _init_worker
+_worker_rules: dict[str, _CompiledRules] = {}
+_worker_header: list[str] = []
+_worker_pulldata: dict[str, PulldataSource] = {}
+
+
+def _init_worker(
+    parsed: dict[str, _ParsedRules],
+    header: list[str],
+    pulldata_paths: Mapping[str, str | os.PathLike[str]],
+) -> None:
+    global _worker_rules, _worker_header, _worker_pulldata
+    _worker_rules = _compile_rules(parsed)
+    _worker_header = header
+    # Closed when the worker process exits
+    _worker_pulldata = {name: PulldataSource(path) for name, path in pulldata_paths.items()}
+
+
+def _check_chunk(rows: list[list[str]], first_row_number: int) -> list[Violation]:
+    return _check_rows(
+        _worker_rules, _worker_header, rows, first_row_number, _worker_pulldata
+    )
+
+
+def _iter_chunks(
+    reader: Iterator[list[str]], chunk_size: int
+) -> Iterator[tuple[list[list[str]], int]]:
+    row_number = 1
+    while chunk := list(islice(reader, chunk_size)):
+        yield chunk, row_number
+        row_number += len(chunk)
+
+
+def revalidate_csv(
+    fields: Mapping[str, FieldRules],
+    csv_path: str | os.PathLike[str],
+    output_path: str | os.PathLike[str],
+    chunk_size: int = 10_000,
+    workers: int | None = None,
+    max_pending_chunks: int | None = None,
+    pulldata: Mapping[str, str | os.PathLike[str]] | None = None,
+) -> RevalidationReport:
+    """
+    Re-checks the `required` and `constraint` rules of `fields` against a CSV
+    export of submissions, writing one JSON violation per line to `output_path`.
+
+    Expressions are parsed once; the export is streamed in chunks of
+    `chunk_size` rows that are evaluated by a pool of `workers` processes
+    (in-process when `workers` is 0). At most `max_pending_chunks` chunks
+    (default: twice the number of workers) are in flight at any time, so memory
+    use does not grow with the size of the export. Violations are written in row
+    order as soon as their chunk is done.
+
+    `pulldata` maps the instance names used in `pulldata()` calls to their
+    CSV attachments. Expressions that raise, e.g. on an invalid dynamic regex,
+    are written as "error" violations.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    parsed = parse_rules(fields)
+    # Compiled here even when workers compile their own copy (compiled rules
+    # don't pickle), so that invalid rules raise before the pool starts
+    rules = _compile_rules(parsed)
+    pulldata_paths = dict(pulldata or {})
+    worker_count = (os.cpu_count() or 1) if workers is None else workers
+    max_pending = max_pending_chunks or max(2 * worker_count, 1)
+
+    start = time.perf_counter()
+    row_count = 0
+    violation_count = 0
+
+    with (
+        ExitStack() as stack,
+        open(csv_path, newline="", encoding="utf-8-sig") as csv_file,
+        open(output_path, "w", encoding="utf-8") as output,
+    ):
+        sources = _open_pulldata(parsed, pulldata_paths, stack)
+        reader = csv.reader(csv_file)
+        header = next(reader, [])
+
+        def write(violations: list[Violation]) -> None:
+            nonlocal violation_count
+            for violation in violations:
+                output.write(json.dumps(violation, ensure_ascii=False))
+                output.write("\n")
+            violation_count += len(violations)
+
+        if worker_count == 0:
+            for chunk, first_row_number in _iter_chunks(reader, chunk_size):
+                row_count += len(chunk)
+                write(_check_rows(rules, header, chunk, first_row_number, sources))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=worker_count,
+                initializer=_init_worker,
+                initargs=(parsed, header, pulldata_paths),
+            ) as executor:
+                pending: deque[Future[list[Violation]]] = deque()
+                for chunk, first_row_number in _iter_chunks(reader, chunk_size):
+                    row_count += len(chunk)
+                    if len(pending) >= max_pending:
+                        write(pending.popleft().result())
+                    pending.append(executor.submit(_check_chunk, chunk, first_row_number))
+                while pending:
+                    write(pending.popleft().result())
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": row_count,
+        "violations": violation_count,
+        "seconds": seconds,
+        "rows_per_second": row_count / seconds if seconds > 0 else 0.0,
+    }
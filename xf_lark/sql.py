@@ -0,0 +1,579 @@
+import re
+from collections.abc import Callable, Mapping
+from typing import Literal, TypeAlias, TypedDict
+
+from .ast_nodes import AnyASTNode, ExpressionAST
+from .functions import XFValue
+from .traversal import children, walk
+from .type_inference import FUNCTION_SIGNATURES, xlsform_type_to_xf_type
+
+SQLDialect: TypeAlias = Literal["sqlite", "postgres"]
+
+# The SQL-level representation of a compiled subexpression:
+# - "number": REAL, NULL standing in for NaN
+# - "string": TEXT, never NULL (empty values are '')
+# - "boolean": a boolean expression, never NULL
+# - "column": a `${field}` reference, treated as a string unless used as a number
+_Kind: TypeAlias = Literal["number", "string", "boolean", "column"]
+
+
+class SQLCompileError(ValueError):
+    pass
+
+
+class SQLExpression(TypedDict):
+    sql: str
+    params: list[XFValue]
+
+
+class _Fragment:
+    __slots__ = ("sql", "params", "kind", "numeric_column")
+
+    def __init__(
+        self,
+        sql: str,
+        params: list[XFValue],
+        kind: _Kind,
+        numeric_column: bool = False,
+    ):
+        self.sql: str = sql
+        self.params: list[XFValue] = params
+        self.kind: _Kind = kind
+        # A column hinted as numeric can be cast directly
+        self.numeric_column: bool = numeric_column
+
+
+_TEMPLATE_FIELD = re.compile(r"\{(\d+)\}")
+# Fragments up to this length are pasted at every use in a template. Longer
+# ones are computed once in a subquery, which costs SQLite parser stack depth.
+_REPEATABLE_LENGTH = 200
+
+
+def _fill(template: str, fragments: list[_Fragment], kind: _Kind) -> _Fragment:
+    sql_parts: list[str] = []
+    params: list[XFValue] = []
+    # Splitting on the fields alternates literal SQL and fragment indexes
+    for i, part in enumerate(_TEMPLATE_FIELD.split(template)):
+        if i % 2 == 0:
+            sql_parts.append(part)
+        else:
+            fragment = fragments[int(part)]
+            sql_parts.append(fragment.sql)
+            params.extend(fragment.params)
+    return _Fragment("".join(sql_parts), params, kind)
+
+
+def _combine(template: str, fragments: list[_Fragment], kind: _Kind) -> _Fragment:
+    """
+    Fills `{0}`, `{1}`, ... in `template` with the fragments' SQL.
+
+    Pasting a long fragment at every use would multiply the SQL at every
+    nesting level, so when the template uses one several times, the fragments
+    are computed once as the columns of a one-row subquery and the template
+    refers to those columns instead.
+    """
+    indexes = [int(index) for index in _TEMPLATE_FIELD.findall(template)]
+    if all(
+        indexes.count(i) == 1 or len(fragments[i].sql) <= _REPEATABLE_LENGTH
+        for i in set(indexes)
+    ):
+        return _fill(template, fragments, kind)
+    # Every fragment moves to the subquery, so that the template only names
+    # the subquery's columns and cannot capture the fragments' column names
+    used = sorted(set(indexes))
+    bound_template = (
+        "(SELECT "
+        + _TEMPLATE_FIELD.sub(r"operands.v\1", template)
+        + " FROM (SELECT "
+        + ", ".join(f"{{{i}}} AS v{i}" for i in used)
+        + ") AS operands)"
+    )
+    return _fill(bound_template, fragments, kind)
+
+
+# Doubles of this magnitude and above are all integers, and overflow SQLite's
+# INTEGER casts
+_SQLITE_INTEGRAL = "4503599627370496.0"
+
+_DIALECT_SQL: dict[SQLDialect, dict[str, str]] = {
+    "sqlite": {
+        "placeholder": "?",
+        "real": "REAL",
+        # Division by zero is signed Infinity, or NaN for 0 div 0 (0 * Infinity
+        # is NULL in SQLite); adding {1} keeps NaN divisors NaN
+        "divide": "COALESCE({0} / NULLIF({1}, 0), {0} * 9e999 + {1})",
+        # SQLite's % casts its operands to INTEGER
+        "modulus": "({0} - {1} * CAST({0} / NULLIF({1}, 0) AS INTEGER))",
+        "trim": "TRIM({0}, ' ' || CHAR(9, 10, 11, 12, 13))",
+        # Trimmed text to a number like functions.to_number: numbers, then
+        # ISO 8601 dates as days since the epoch, anything else NaN
+        "text_to_number": (
+            "(CASE WHEN {0} GLOB '*[0-9]*' AND NOT ({0} GLOB '*[^0-9.-]*' "
+            "OR {0} GLOB '?*-*' OR {0} GLOB '*.*.*') THEN CAST({0} AS REAL) "
+            "WHEN {0} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' "
+            "THEN JULIANDAY({0}) - 2440587.5 END)"
+        ),
+        # SQLite columns are dynamically typed: numbers stored as INTEGER or
+        # REAL convert like numbers, {1} converts text
+        "column_to_number": (
+            "(CASE WHEN TYPEOF({0}) IN ('integer', 'real') THEN CAST({0} AS REAL) "
+            "ELSE {1} END)"
+        ),
+        "column_to_string": (
+            "(CASE WHEN TYPEOF({0}) IN ('integer', 'real') THEN {1} "
+            "ELSE COALESCE(CAST({0} AS TEXT), '') END)"
+        ),
+        "number_to_string": (
+            "(CASE WHEN {0} IS NULL THEN 'NaN' "
+            "WHEN {0} = 9e999 THEN 'Infinity' WHEN {0} = -9e999 THEN '-Infinity' "
+            "WHEN {0} = CAST({0} AS INTEGER) THEN CAST(CAST({0} AS INTEGER) AS TEXT) "
+            "ELSE CAST({0} AS TEXT) END)"
+        ),
+        "truncate": (
+            f"(CASE WHEN ABS({{0}}) < {_SQLITE_INTEGRAL} "
+            "THEN CAST(CAST({0} AS INTEGER) AS REAL) ELSE {0} END)"
+        ),
+        "floor": (
+            f"(CASE WHEN NOT ABS({{0}}) < {_SQLITE_INTEGRAL} THEN {{0}} "
+            "WHEN {0} < CAST({0} AS INTEGER) THEN CAST({0} AS INTEGER) - 1.0 "
+            "ELSE CAST(CAST({0} AS INTEGER) AS REAL) END)"
+        ),
+        "ceiling": (
+            f"(CASE WHEN NOT ABS({{0}}) < {_SQLITE_INTEGRAL} THEN {{0}} "
+            "WHEN {0} > CAST({0} AS INTEGER) THEN CAST({0} AS INTEGER) + 1.0 "
+            "ELSE CAST(CAST({0} AS INTEGER) AS REAL) END)"
+        ),
+        "contains": "(INSTR({0}, {1}) > 0)",
+        "ends-with": "(LENGTH({1}) = 0 OR SUBSTR({0}, -LENGTH({1})) = {1})",
+    },
+    "postgres": {
+        "placeholder": "%s",
+        "real": "DOUBLE PRECISION",
+        # NULLIF keeps PostgreSQL from raising when it folds constant operands
+        "divide": (
+            "(CASE WHEN {1} = 0 THEN (CASE "
+            "WHEN {0} > 0 THEN CAST('Infinity' AS DOUBLE PRECISION) "
+            "WHEN {0} < 0 THEN CAST('-Infinity' AS DOUBLE PRECISION) END) "
+            "ELSE {0} / NULLIF({1}, 0) END)"
+        ),
+        # PostgreSQL has no % for DOUBLE PRECISION
+        "modulus": "({0} - {1} * TRUNC({0} / NULLIF({1}, 0)))",
+        "trim": "BTRIM({0}, ' ' || CHR(9) || CHR(10) || CHR(11) || CHR(12) || CHR(13))",
+        # Malformed dates such as 2021-02-30 raise an error rather than being NaN
+        "text_to_number": (
+            "(CASE WHEN {0} ~ '^-?([0-9]+(\\.[0-9]*)?|\\.[0-9]+)$' "
+            "THEN CAST({0} AS DOUBLE PRECISION) "
+            "WHEN {0} ~ '^[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]$' "
+            "THEN CAST(CAST({0} AS DATE) - DATE '1970-01-01' AS DOUBLE PRECISION) "
+            "WHEN {0} ~ '^[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9][T ]"
+            ".*(Z|[+-][0-9][0-9](:?[0-9][0-9])?)$' "
+            "THEN CAST(EXTRACT(EPOCH FROM CAST({0} AS TIMESTAMPTZ)) / 86400 AS DOUBLE PRECISION) "
+            "WHEN {0} ~ '^[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9][T ]' "
+            "THEN CAST(EXTRACT(EPOCH FROM CAST({0} AS TIMESTAMP)) / 86400 AS DOUBLE PRECISION) "
+            "END)"
+        ),
+        "column_to_number": "{1}",
+        "column_to_string": "COALESCE(CAST({0} AS TEXT), '')",
+        "number_to_string": "COALESCE(CAST({0} AS TEXT), 'NaN')",
+        "truncate": "TRUNC({0})",
+        "floor": "FLOOR({0})",
+        "ceiling": "CEIL({0})",
+        "contains": "(STRPOS({0}, {1}) > 0)",
+        "ends-with": "(RIGHT({0}, LENGTH({1})) = {1})",
+    },
+}
+
+_ARITHMETIC_SQL = {
+    "add": "({0} + {1})",
+    "subtract": "({0} - {1})",
+    "multiply": "({0} * {1})",
+}
+
+_COMPARISON_SQL = {
+    "eq": "=",
+    "ne": "<>",
+    "lt": "<",
+    "gt": ">",
+    "lte": "<=",
+    "gte": ">=",
+}
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLCompiler:
+    """
+    Compiles expression ASTs to parameterized SQL for SQLite or PostgreSQL.
+
+    `${field}` references become columns (renamed through `columns`), `.` becomes
+    `current_column`, and literals become query parameters. XPath semantics are
+    kept where SQL allows it: empty values are NaN (NULL) in arithmetic,
+    comparisons involving NaN are false and `!=` is the negation of `=`.
+    Text in numeric contexts converts like the Python evaluator: numeric text
+    is a number, ISO 8601 dates are days since the epoch and anything else is
+    NaN. Division by zero is Infinity. Bare names,
+    `..`, node-sets and functions outside SUPPORTED_FUNCTIONS raise
+    SQLCompileError.
+    """
+
+    def __init__(
+        self,
+        columns: Mapping[str, str] | None = None,
+        field_types: Mapping[str, str] | None = None,
+        dialect: SQLDialect = "sqlite",
+        current_column: str | None = None,
+    ):
+        if dialect not in _DIALECT_SQL:
+            raise ValueError(f"Unsupported SQL dialect: {dialect!r}")
+        self.columns: Mapping[str, str] = columns or {}
+        self.numeric_fields: frozenset[str] = frozenset(
+            name
+            for name, field_type in (field_types or {}).items()
+            if xlsform_type_to_xf_type(field_type) == "number"
+        )
+        self.dialect: SQLDialect = dialect
+        self.current_column: str | None = current_column
+        self.dialect_sql: dict[str, str] = _DIALECT_SQL[dialect]
+
+    # --- Conversions between fragment kinds ---
+
+    def as_number(self, fragment: _Fragment) -> _Fragment:
+        if fragment.kind == "number":
+            return fragment
+        if fragment.kind == "boolean":
+            return _combine(
+                "(CASE WHEN {0} THEN 1.0 ELSE 0.0 END)", [fragment], "number"
+            )
+        real = self.dialect_sql["real"]
+        if fragment.numeric_column:
+            return _combine(f"CAST(NULLIF({{0}}, '') AS {real})", [fragment], "number")
+        if fragment.kind == "column":
+            text = _combine("COALESCE(CAST({0} AS TEXT), '')", [fragment], "string")
+        else:
+            text = self.as_string(fragment)
+        trimmed = _combine(self.dialect_sql["trim"], [text], "string")
+        number = _combine(self.dialect_sql["text_to_number"], [trimmed], "number")
+        if fragment.kind == "column":
+            return _combine(self.dialect_sql["column_to_number"], [fragment, number], "number")
+        return number
+
+    def as_string(self, fragment: _Fragment) -> _Fragment:
+        if fragment.kind == "string":
+            return fragment
+        if fragment.kind == "column":
+            # {1} formats numbers stored in the column, e.g. REAL 5.0 as "5"
+            number = _combine(self.dialect_sql["number_to_string"], [fragment], "string")
+            return _combine(
+                self.dialect_sql["column_to_string"], [fragment, number], "string"
+            )
+        if fragment.kind == "boolean":
+            return _combine(
+                "(CASE WHEN {0} THEN 'true' ELSE 'false' END)", [fragment], "string"
+            )
+        return _combine(self.dialect_sql["number_to_string"], [fragment], "string")
+
+    def as_boolean(self, fragment: _Fragment) -> _Fragment:
+        if fragment.kind == "boolean":
+            return fragment
+        if fragment.kind == "number":
+            return _combine("COALESCE({0} <> 0, FALSE)", [fragment], "boolean")
+        return _combine("({0} <> '')", [self.as_string(fragment)], "boolean")
+
+    def convert(self, fragment: _Fragment, kind: _Kind) -> _Fragment:
+        converters: dict[_Kind, Callable[[_Fragment], _Fragment]] = {
+            "number": self.as_number,
+            "string": self.as_string,
+            "boolean": self.as_boolean,
+        }
+        return converters[kind](fragment)
+
+    # --- Nodes ---
+
+    def parameter(self, value: XFValue, kind: _Kind) -> _Fragment:
+        return _Fragment(self.dialect_sql["placeholder"], [value], kind)
+
+    def column(self, name: str) -> _Fragment:
+        return _Fragment(
+            _quote_identifier(self.columns.get(name, name)),
+            [],
+            "column",
+            numeric_column=name in self.numeric_fields,
+        )
+
+    def current(self) -> _Fragment:
+        """`.`, also the implicit argument of e.g. `string-length()`."""
+        if self.current_column is None:
+            raise SQLCompileError("`.` requires a current_column")
+        return self.column(self.current_column)
+
+    def compile(self, ast: AnyASTNode) -> _Fragment:
+        """Compiles children before parents, with an explicit stack."""
+        compiled: dict[int, _Fragment] = {}
+        for node in walk(ast, order="post"):
+            # Popping lets each child's SQL be freed once its parent embeds it
+            compiled[id(node)] = self.compile_node(
+                node, [compiled.pop(id(child)) for child in children(node)]
+            )
+        return compiled[id(ast)]
+
+    def compile_node(
+        self, node: AnyASTNode, compiled_children: list[_Fragment]
+    ) -> _Fragment:
+        node_type = node["type"]
+
+        if node_type == "number_literal":
+            return self.parameter(node["value"], "number")
+        if node_type == "string_literal":
+            return self.parameter(node["value"], "string")
+        if node_type == "variable_ref":
+            return self.column(node["name"])
+        if node_type == "current_ref":
+            return self.current()
+        if node_type == "unary_op":
+            (operand,) = compiled_children
+            return _combine("(-{0})", [self.as_number(operand)], "number")
+        if node_type == "binary_op":
+            return self.compile_binary_op(node, *compiled_children)
+        if node_type == "function_call":
+            return self.compile_function_call(node, compiled_children)
+
+        raise SQLCompileError(f"Cannot compile {node_type!r} nodes to SQL")
+
+    def compile_binary_op(self, node, left: _Fragment, right: _Fragment) -> _Fragment:
+        operator = node["operator"]
+
+        if operator in ("and", "or"):
+            return _combine(
+                f"({{0}} {operator.upper()} {{1}})",
+                [self.as_boolean(left), self.as_boolean(right)],
+                "boolean",
+            )
+
+        if operator in _ARITHMETIC_SQL or operator in ("divide", "modulus"):
+            return _combine(
+                _ARITHMETIC_SQL.get(operator) or self.dialect_sql[operator],
+                [self.as_number(left), self.as_number(right)],
+                "number",
+            )
+
+        if operator in ("eq", "ne"):
+            if "boolean" in (left.kind, right.kind):
+                kind: _Kind = "boolean"
+            elif "number" in (left.kind, right.kind):
+                kind = "number"
+            else:
+                kind = "string"
+            equal = _combine(
+                "COALESCE({0} = {1}, FALSE)" if kind == "number" else "({0} = {1})",
+                [self.convert(left, kind), self.convert(right, kind)],
+                "boolean",
+            )
+            # NaN != x is true in XPath, so `!=` is the negation of `=`
+            return equal if operator == "eq" else _combine("(NOT {0})", [equal], "boolean")
+
+        if operator in _COMPARISON_SQL:
+            return _combine(
+                f"COALESCE({{0}} {_COMPARISON_SQL[operator]} {{1}}, FALSE)",
+                [self.as_number(left), self.as_number(right)],
+                "boolean",
+            )
+
+        raise SQLCompileError(f"Cannot compile operator {operator!r} to SQL")
+
+    def compile_function_call(self, node, arguments: list[_Fragment]) -> _Fragment:
+        name: str = node["name"]
+        compile_function = _FUNCTIONS.get(name)
+        if compile_function is None:
+            raise SQLCompileError(f"{name}() is not supported in SQL")
+        signature = FUNCTION_SIGNATURES[name]
+        arity = len(node["arguments"])
+        if arity < signature["min_args"] or (
+            signature["max_args"] is not None and arity > signature["max_args"]
+        ):
+            raise SQLCompileError(f"Wrong number of arguments for {name}(): {arity}")
+        return compile_function(self, arguments)
+
+    def unify(self, fragments: list[_Fragment]) -> tuple[list[_Fragment], _Kind]:
+        """Converts branches of if()/coalesce() to one kind, strings when they differ."""
+        kinds = {"string" if f.kind == "column" else f.kind for f in fragments}
+        kind: _Kind = kinds.pop() if len(kinds) == 1 else "string"
+        return [self.convert(fragment, kind) for fragment in fragments], kind
+
+    def value(self, ast: ExpressionAST) -> SQLExpression:
+        fragment = self.compile(ast)
+        if fragment.kind == "column":
+            fragment = self.as_string(fragment)
+        return {"sql": fragment.sql, "params": fragment.params}
+
+    def condition(self, ast: ExpressionAST) -> SQLExpression:
+        fragment = self.as_boolean(self.compile(ast))
+        return {"sql": fragment.sql, "params": fragment.params}
+
+
+# --- Functions ---
+
+
+def _sql_if(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    branches, kind = compiler.unify(arguments[1:])
+    return _combine(
+        "(CASE WHEN {0} THEN {1} ELSE {2} END)",
+        [compiler.as_boolean(arguments[0]), *branches],
+        kind,
+    )
+
+
+def _sql_coalesce(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    branches, kind = compiler.unify(arguments)
+    if kind != "string":
+        # Numbers (even NaN) and booleans are never empty
+        return branches[0]
+    return _combine("(CASE WHEN {0} <> '' THEN {0} ELSE {1} END)", branches, kind)
+
+
+def _sql_concat(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    if not arguments:
+        return compiler.parameter("", "string")
+    template = "(" + " || ".join(f"{{{i}}}" for i in range(len(arguments))) + ")"
+    return _combine(template, [compiler.as_string(a) for a in arguments], "string")
+
+
+def _sql_floor(compiler: SQLCompiler, value: _Fragment) -> _Fragment:
+    return _combine(compiler.dialect_sql["floor"], [value], "number")
+
+
+def _sql_round(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    value = compiler.as_number(arguments[0])
+    if len(arguments) == 1:
+        # XPath round(): floor(x + 0.5)
+        return _sql_floor(compiler, _combine("({0} + 0.5)", [value], "number"))
+    # ODK rounds half away from zero with a precision, like SQL ROUND
+    digits = _combine(
+        "CAST({0} AS INTEGER)", [compiler.as_number(arguments[1])], "number"
+    )
+    if compiler.dialect == "postgres":
+        rounded = "ROUND(CAST({0} AS NUMERIC), {1})"
+    else:
+        # SQLite treats a negative precision as 0: scale by 10^-digits instead
+        rounded = (
+            "(CASE WHEN {1} < 0 THEN ROUND({0} / CAST('1e' || -{1} AS REAL)) "
+            "* CAST('1e' || -{1} AS REAL) ELSE ROUND({0}, {1}) END)"
+        )
+    return _combine(
+        f"CAST({rounded} AS {compiler.dialect_sql['real']})", [value, digits], "number"
+    )
+
+
+def _sql_count_selected(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    trimmed = _combine("TRIM({0})", [compiler.as_string(arguments[0])], "string")
+    return _combine(
+        "(CASE WHEN {0} = '' THEN 0.0 "
+        "ELSE LENGTH({0}) - LENGTH(REPLACE({0}, ' ', '')) + 1.0 END)",
+        [trimmed],
+        "number",
+    )
+
+
+def _sql_selected(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    padded = [
+        _combine("(' ' || {0} || ' ')", [compiler.as_string(argument)], "string")
+        for argument in arguments
+    ]
+    return _combine(compiler.dialect_sql["contains"], padded, "boolean")
+
+
+def _argument_or_current(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    """The only argument of `string()` and `string-length()`, `.` when omitted."""
+    return arguments[0] if arguments else compiler.current()
+
+
+def _sql_string_length(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+    return _combine(
+        f"CAST(LENGTH({{0}}) AS {compiler.dialect_sql['real']})",
+        [compiler.as_string(_argument_or_current(compiler, arguments))],
+        "number",
+    )
+
+
+def _string_predicate(template: str) -> Callable[[SQLCompiler, list[_Fragment]], _Fragment]:
+    def compile_function(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+        return _combine(
+            compiler.dialect_sql.get(template, template),
+            [compiler.as_string(argument) for argument in arguments],
+            "boolean",
+        )
+
+    return compile_function
+
+
+def _numeric_function(template: str) -> Callable[[SQLCompiler, list[_Fragment]], _Fragment]:
+    def compile_function(compiler: SQLCompiler, arguments: list[_Fragment]) -> _Fragment:
+        return _combine(
+            compiler.dialect_sql.get(template, template),
+            [compiler.as_number(argument) for argument in arguments],
+            "number",
+        )
+
+    return compile_function
+
+
+_FUNCTIONS: dict[str, Callable[[SQLCompiler, list[_Fragment]], _Fragment]] = {
+    "true": lambda compiler, arguments: _Fragment("TRUE", [], "boolean"),
+    "false": lambda compiler, arguments: _Fragment("FALSE", [], "boolean"),
+    "not": lambda compiler, arguments: _combine(
+        "(NOT {0})", [compiler.as_boolean(arguments[0])], "boolean"
+    ),
+    "boolean": lambda compiler, arguments: compiler.as_boolean(arguments[0]),
+    "number": lambda compiler, arguments: compiler.as_number(arguments[0]),
+    "string": lambda compiler, arguments: compiler.as_string(
+        _argument_or_current(compiler, arguments)
+    ),
+    "if": _sql_if,
+    "coalesce": _sql_coalesce,
+    "concat": _sql_concat,
+    "string-length": _sql_string_length,
+    "contains": _string_predicate("contains"),
+    "starts-with": _string_predicate("(SUBSTR({0}, 1, LENGTH({1})) = {1})"),
+    "ends-with": _string_predicate("ends-with"),
+    "selected": _sql_selected,
+    "count-selected": _sql_count_selected,
+    "int": _numeric_function("truncate"),
+    "round": _sql_round,
+    "floor": lambda compiler, arguments: _sql_floor(
+        compiler, compiler.as_number(arguments[0])
+    ),
+    "ceiling": _numeric_function("ceiling"),
+    "abs": _numeric_function("ABS({0})"),
+}
+
+SUPPORTED_FUNCTIONS: frozenset[str] = frozenset(_FUNCTIONS)
+
+
+def compile_to_sql(
+    ast: ExpressionAST,
+    columns: Mapping[str, str] | None = None,
+    field_types: Mapping[str, str] | None = None,
+    dialect: SQLDialect = "sqlite",
+    current_column: str | None = None,
+) -> SQLExpression:
+    """Compiles an AST to a parameterized SQL value expression."""
+    return SQLCompiler(columns, field_types, dialect, current_column).value(ast)
+
+
+def compile_condition(
+    ast: ExpressionAST,
+    columns: Mapping[str, str] | None = None,
+    field_types: Mapping[str, str] | None = None,
+    dialect: SQLDialect = "sqlite",
+    current_column: str | None = None,
+) -> SQLExpression:
+    """
+    Compiles an AST to a parameterized SQL boolean expression for a WHERE
+    clause, e.g. to select the rows violating a constraint:
+
+        condition = compile_condition(parser.parse(constraint), current_column="age")
+        sql = f"SELECT id FROM submissions WHERE NOT {condition['sql']}"
+        connection.execute(sql, condition["params"])
+    """
+    return SQLCompiler(columns, field_types, dialect, current_column).condition(ast)
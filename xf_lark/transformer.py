@@ -1,4 +1,5 @@
-from lark import Token, Transformer, v_args
+from lark import Token, v_args
+from lark.visitors import Transformer_NonRecursive
 
 from .ast_nodes import (
     AnyASTNode,
@@ -14,7 +15,8 @@ from .ast_nodes import (
 )
 
 
-class AstTransformer(Transformer[Token, AnyASTNode]):
+# Non-recursive, so deeply nested expressions don't hit the recursion limit
+class AstTransformer(Transformer_NonRecursive):
     def number_literal(self, items: list[Token]) -> NumberLiteralNode:
         return {"type": "number_literal", "value": float(items[0].value)}
 
@@ -73,6 +75,14 @@ class AstTransformer(Transformer[Token, AnyASTNode]):
             "right": items[2],
         }
 
+    def modulus(self, items: list[AnyASTNode]) -> BinaryOpNode:
+        return {
+            "type": "binary_op",
+            "operator": "modulus",
+            "left": items[0],
+            "right": items[2],
+        }
+
     def eq(self, items: list[AnyASTNode]) -> BinaryOpNode:
         return {
             "type": "binary_op",
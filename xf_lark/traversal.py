@@ -0,0 +1,208 @@
+from collections.abc import Callable, Iterator
+from typing import Any, Literal
+
+from .ast_nodes import AnyASTNode, ASTPath, ExpressionAST
+
+# The keys holding child nodes, per node type, in source order
+CHILD_KEYS: dict[str, tuple[str, ...]] = {
+    "unary_op": ("operand",),
+    "binary_op": ("left", "right"),
+    "function_call": ("arguments",),
+}
+
+NODE_TYPES: tuple[str, ...] = (
+    "number_literal",
+    "string_literal",
+    "variable_ref",
+    "bare_variable_ref",
+    "current_ref",
+    "parent_ref",
+    "unary_op",
+    "binary_op",
+    "function_call",
+)
+
+# Returned by a Visitor method to skip the children of the visited node
+SKIP = object()
+
+
+def iter_children(node: AnyASTNode) -> Iterator[tuple[ASTPath, AnyASTNode]]:
+    """Yields each child of a node with its path relative to the node."""
+    if node["type"] == "function_call":
+        for i, argument in enumerate(node["arguments"]):
+            yield ("arguments", i), argument
+        return
+    for key in CHILD_KEYS.get(node["type"], ()):
+        yield (key,), node[key]
+
+
+def children(node: AnyASTNode) -> list[AnyASTNode]:
+    node_type = node["type"]
+    if node_type == "function_call":
+        return node["arguments"]
+    return [node[key] for key in CHILD_KEYS.get(node_type, ())]
+
+
+def walk(ast: ExpressionAST, order: Literal["pre", "post"] = "pre") -> Iterator[AnyASTNode]:
+    """
+    Yields every node of an AST, parents before children ("pre") or children
+    before parents ("post"), children in source order. Uses an explicit
+    stack, so the depth of the AST is not limited by Python's recursion limit.
+    """
+    if order == "pre":
+        stack: list[AnyASTNode] = [ast]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(children(node)))
+    elif order == "post":
+        post_stack: list[tuple[AnyASTNode, bool]] = [(ast, False)]
+        while post_stack:
+            node, children_done = post_stack.pop()
+            if children_done:
+                yield node
+                continue
+            post_stack.append((node, True))
+            post_stack.extend((child, False) for child in reversed(children(node)))
+    else:
+        raise ValueError(f"Unknown traversal order: {order!r}")
+
+
+def walk_with_paths(
+    ast: ExpressionAST, order: Literal["pre", "post"] = "pre"
+) -> Iterator[tuple[ASTPath, AnyASTNode]]:
+    """
+    Like walk, but also yields the path of each node from the root. Building
+    a path costs time proportional to the node's depth, so prefer walk when
+    the paths are not needed.
+    """
+    if order == "pre":
+        stack: list[tuple[ASTPath, AnyASTNode]] = [((), ast)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            stack.extend(
+                (path + step, child) for step, child in reversed(list(iter_children(node)))
+            )
+    elif order == "post":
+        post_stack: list[tuple[ASTPath, AnyASTNode, bool]] = [((), ast, False)]
+        while post_stack:
+            path, node, children_done = post_stack.pop()
+            if children_done:
+                yield path, node
+                continue
+            post_stack.append((path, node, True))
+            post_stack.extend(
+                (path + step, child, False)
+                for step, child in reversed(list(iter_children(node)))
+            )
+    else:
+        raise ValueError(f"Unknown traversal order: {order!r}")
+
+
+def _dispatch_table(cls: type, prefix: str) -> dict[str, str]:
+    return {
+        node_type: f"{prefix}{node_type}"
+        for node_type in NODE_TYPES
+        if callable(getattr(cls, f"{prefix}{node_type}", None))
+    }
+
+
+class Visitor:
+    """
+    Pre-order visitor. Subclasses define `visit_<node type>(node)` methods,
+    e.g. `visit_variable_ref`; `generic_visit` is called for node types
+    without one. Returning SKIP from a method skips the node's children.
+
+    The mapping from node type to method is built once per subclass, so
+    visiting a node costs one dict lookup instead of a chain of type checks.
+    """
+
+    _dispatch: dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = _dispatch_table(cls, "visit_")
+
+    def generic_visit(self, node: AnyASTNode) -> object:
+        return None
+
+    def visit(self, ast: ExpressionAST) -> None:
+        dispatch = self._dispatch
+        stack: list[AnyASTNode] = [ast]
+        while stack:
+            node = stack.pop()
+            method_name = dispatch.get(node["type"])
+            if method_name is None:
+                result = self.generic_visit(node)
+            else:
+                result = getattr(self, method_name)(node)
+            if result is not SKIP:
+                stack.extend(reversed(children(node)))
+
+
+class Transformer:
+    """
+    Bottom-up rewriter. Subclasses define `transform_<node type>(node)`
+    methods returning a replacement node (or the node itself); they receive
+    the node with its children already transformed. Nodes are copied only
+    when one of their children changed, so unchanged subtrees are shared with
+    the input, which is never modified.
+    """
+
+    _dispatch: dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = _dispatch_table(cls, "transform_")
+
+    def transform_node(self, node: AnyASTNode) -> AnyASTNode:
+        method_name = self._dispatch.get(node["type"])
+        if method_name is None:
+            return node
+        return getattr(self, method_name)(node)
+
+    def transform(self, ast: ExpressionAST) -> ExpressionAST:
+        results: list[AnyASTNode] = []
+        stack: list[tuple[AnyASTNode, bool]] = [(ast, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children(node)))
+                continue
+
+            old_children = children(node)
+            if old_children:
+                new_children = results[len(results) - len(old_children) :]
+                del results[len(results) - len(old_children) :]
+                if any(new is not old for new, old in zip(new_children, old_children)):
+                    node = _with_children(node, new_children)
+
+            results.append(self.transform_node(node))
+        return results[0]
+
+
+def _with_children(node: AnyASTNode, new_children: list[AnyASTNode]) -> AnyASTNode:
+    copy: Any = dict(node)
+    if node["type"] == "function_call":
+        copy["arguments"] = new_children
+    else:
+        for key, child in zip(CHILD_KEYS[node["type"]], new_children):
+            copy[key] = child
+    return copy
+
+
+class _FunctionTransformer(Transformer):
+    def __init__(self, rewrite: Callable[[AnyASTNode], AnyASTNode]):
+        self.rewrite: Callable[[AnyASTNode], AnyASTNode] = rewrite
+
+    def transform_node(self, node: AnyASTNode) -> AnyASTNode:
+        return self.rewrite(node)
+
+
+def transform(
+    ast: ExpressionAST, rewrite: Callable[[AnyASTNode], AnyASTNode]
+) -> ExpressionAST:
+    """Applies `rewrite` to every node, bottom-up, like a Transformer."""
+    return _FunctionTransformer(rewrite).transform(ast)
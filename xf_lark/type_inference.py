@@ -0,0 +1,355 @@
+import math
+from collections.abc import Mapping
+from typing import Literal, TypeAlias, TypedDict
+
+from .ast_nodes import AnyASTNode, ASTPath, ExpressionAST
+from .functions import to_number
+from .traversal import iter_children
+
+XFType: TypeAlias = Literal["number", "string", "boolean", "date", "nodeset", "any"]
+
+
+class FunctionSignature(TypedDict):
+    returns: XFType
+    min_args: int
+    max_args: int | None  # None means variadic
+    nodeset_args: tuple[int, ...]  # Argument positions that must be references
+
+
+class TypeIssue(TypedDict):
+    path: ASTPath
+    node_type: str
+    message: str
+
+
+def _signature(
+    returns: XFType,
+    min_args: int,
+    max_args: int | None = None,
+    nodeset_args: tuple[int, ...] = (),
+) -> FunctionSignature:
+    return {
+        "returns": returns,
+        "min_args": min_args,
+        "max_args": max_args,
+        "nodeset_args": nodeset_args,
+    }
+
+
+# Signatures of the standard XLSForm/ODK XPath functions. Functions missing from
+# this table are treated as returning "any" with unchecked arity.
+FUNCTION_SIGNATURES: dict[str, FunctionSignature] = {
+    # Boolean
+    "true": _signature("boolean", 0, 0),
+    "false": _signature("boolean", 0, 0),
+    "not": _signature("boolean", 1, 1),
+    "boolean": _signature("boolean", 1, 1),
+    "boolean-from-string": _signature("boolean", 1, 1),
+    "selected": _signature("boolean", 2, 2),
+    "regex": _signature("boolean", 2, 2),
+    "contains": _signature("boolean", 2, 2),
+    "starts-with": _signature("boolean", 2, 2),
+    "ends-with": _signature("boolean", 2, 2),
+    # Number
+    "number": _signature("number", 1, 1),
+    "int": _signature("number", 1, 1),
+    "round": _signature("number", 1, 2),
+    "floor": _signature("number", 1, 1),
+    "ceiling": _signature("number", 1, 1),
+    "abs": _signature("number", 1, 1),
+    "pow": _signature("number", 2, 2),
+    "sqrt": _signature("number", 1, 1),
+    "exp": _signature("number", 1, 1),
+    "exp10": _signature("number", 1, 1),
+    "log": _signature("number", 1, 1),
+    "log10": _signature("number", 1, 1),
+    "pi": _signature("number", 0, 0),
+    "random": _signature("number", 0, 0),
+    "string-length": _signature("number", 0, 1),
+    "count": _signature("number", 1, 1, (0,)),
+    "count-non-empty": _signature("number", 1, 1, (0,)),
+    "count-selected": _signature("number", 1, 1),
+    "sum": _signature("number", 1, 1, (0,)),
+    "max": _signature("number", 1),
+    "min": _signature("number", 1),
+    "position": _signature("number", 0, 1),
+    "decimal-date-time": _signature("number", 1, 1),
+    "decimal-time": _signature("number", 1, 1),
+    # String
+    "string": _signature("string", 0, 1),
+    "concat": _signature("string", 0),
+    "join": _signature("string", 2, 2, (1,)),
+    "substr": _signature("string", 2, 3),
+    "substring-before": _signature("string", 2, 2),
+    "substring-after": _signature("string", 2, 2),
+    "translate": _signature("string", 3, 3),
+    "normalize-space": _signature("string", 0, 1),
+    "selected-at": _signature("string", 2, 2),
+    "uuid": _signature("string", 0, 1),
+    "format-date": _signature("string", 2, 2),
+    "format-date-time": _signature("string", 2, 2),
+    "pulldata": _signature("string", 4, 4),
+    # Date
+    "today": _signature("date", 0, 0),
+    "now": _signature("date", 0, 0),
+    "date": _signature("date", 1, 1),
+    "date-time": _signature("date", 1, 1),
+    # Type depends on the arguments, see _infer_function_call
+    "if": _signature("any", 3, 3),
+    "coalesce": _signature("any", 2, 2),
+    "once": _signature("any", 1, 1),
+    "current": _signature("nodeset", 0, 0),
+}
+
+# Maps the first word of an XLSForm `type` column to the XPath type of its value.
+XLSFORM_TYPE_MAP: dict[str, XFType] = {
+    "integer": "number",
+    "decimal": "number",
+    "range": "number",
+    "text": "string",
+    "select_one": "string",
+    "select_multiple": "string",
+    "select_one_from_file": "string",
+    "select_multiple_from_file": "string",
+    "rank": "string",
+    "barcode": "string",
+    "geopoint": "string",
+    "geotrace": "string",
+    "geoshape": "string",
+    "image": "string",
+    "audio": "string",
+    "video": "string",
+    "file": "string",
+    "acknowledge": "string",
+    "date": "date",
+    "time": "date",
+    "datetime": "date",
+    "begin_repeat": "nodeset",
+    "calculate": "any",
+    "hidden": "any",
+}
+
+_XF_TYPES: frozenset[str] = frozenset(
+    ["number", "string", "boolean", "date", "nodeset", "any"]
+)
+
+_ARITHMETIC_OPERATORS = frozenset(["add", "subtract", "multiply", "divide", "modulus"])
+_ORDERING_OPERATORS = frozenset(["lt", "gt", "lte", "gte"])
+_REFERENCE_NODE_TYPES = frozenset(
+    ["variable_ref", "bare_variable_ref", "current_ref", "parent_ref"]
+)
+
+
+def xlsform_type_to_xf_type(xlsform_type: str) -> XFType:
+    """Maps a survey sheet `type` value (e.g. "select_one cities") to an XFType."""
+    words = xlsform_type.strip().split()
+    if not words:
+        return "any"
+    head = words[0].lower()
+    if head in _XF_TYPES:
+        return head  # pyright: ignore[reportReturnType]
+    if head == "begin" and len(words) > 1 and words[1].lower() == "repeat":
+        return "nodeset"
+    return XLSFORM_TYPE_MAP.get(head, "any")
+
+
+def _is_numeric_string(value: str) -> bool:
+    return not math.isnan(to_number(value))
+
+
+class InferredTypes:
+    """
+    Result of `infer_types`: a side table of inferred types and the guaranteed
+    type errors found in the expression.
+
+    Types are keyed by node identity, so the AST must be kept alive (and not be
+    mutated) for as long as the result is used.
+    """
+
+    def __init__(self, ast: ExpressionAST):
+        self.ast: ExpressionAST = ast
+        self.types: dict[int, XFType] = {}
+        self.issues: list[TypeIssue] = []
+
+    def type_of(self, node: AnyASTNode) -> XFType:
+        return self.types.get(id(node), "any")
+
+    @property
+    def root_type(self) -> XFType:
+        return self.type_of(self.ast)
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+
+class _TypeInferrer:
+    def __init__(
+        self,
+        result: InferredTypes,
+        field_types: Mapping[str, XFType],
+        current_type: XFType,
+    ):
+        self.result: InferredTypes = result
+        self.field_types: Mapping[str, XFType] = field_types
+        self.current_type: XFType = current_type
+        # Parent and path step of every visited node, to rebuild the path of
+        # a node only when an issue is reported on it
+        self.parents: dict[int, tuple[AnyASTNode, ASTPath]] = {}
+
+    def path_of(self, node: AnyASTNode) -> ASTPath:
+        steps: list[ASTPath] = []
+        while id(node) in self.parents:
+            node, step = self.parents[id(node)]
+            steps.append(step)
+        return tuple(key for step in reversed(steps) for key in step)
+
+    def report(self, node: AnyASTNode, message: str):
+        self.result.issues.append(
+            {"path": self.path_of(node), "node_type": node["type"], "message": message}
+        )
+
+    def check_numeric_operand(self, operand: AnyASTNode, consequence: str):
+        """Reports a string literal operand that converts to NaN, e.g. `'abc' + 1`."""
+        if operand["type"] == "string_literal" and not _is_numeric_string(
+            operand["value"]
+        ):
+            self.report(
+                operand,
+                f"String literal {operand['value']!r} is not a number; {consequence}",
+            )
+
+    def infer(self, ast: ExpressionAST) -> XFType:
+        """Infers children before parents, with an explicit stack."""
+        stack: list[tuple[AnyASTNode, bool]] = [(ast, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self.result.types[id(node)] = self._infer(node)
+                continue
+            stack.append((node, True))
+            for step, child in reversed(list(iter_children(node))):
+                self.parents[id(child)] = (node, step)
+                stack.append((child, False))
+        return self.result.type_of(ast)
+
+    def _infer(self, node: AnyASTNode) -> XFType:
+        node_type = node["type"]
+
+        if node_type == "number_literal":
+            return "number"
+        if node_type == "string_literal":
+            return "string"
+        if node_type in ("variable_ref", "bare_variable_ref"):
+            return self.field_types.get(node["name"], "any")
+        if node_type == "current_ref":
+            return self.current_type
+        if node_type == "parent_ref":
+            return "nodeset"
+
+        if node_type == "unary_op":
+            self.check_numeric_operand(node["operand"], "negation always yields NaN")
+            return "number"
+
+        if node_type == "binary_op":
+            return self._infer_binary_op(node)
+
+        if node_type == "function_call":
+            return self._infer_function_call(node)
+
+        return "any"
+
+    def _infer_binary_op(self, node) -> XFType:
+        operator = node["operator"]
+        left_type = self.result.type_of(node["left"])
+        right_type = self.result.type_of(node["right"])
+
+        if operator in _ARITHMETIC_OPERATORS:
+            consequence = f"{operator} always yields NaN"
+            self.check_numeric_operand(node["left"], consequence)
+            self.check_numeric_operand(node["right"], consequence)
+            # Date arithmetic (e.g. `date(${d}) + 5`) stays numeric: days since epoch
+            return "number"
+
+        if operator in _ORDERING_OPERATORS:
+            # XPath 1.0 compares with `<`/`>` numerically unless both sides are dates
+            if left_type != "date" or right_type != "date":
+                # Any comparison with NaN is false
+                consequence = f"{operator} comparison is always false"
+                self.check_numeric_operand(node["left"], consequence)
+                self.check_numeric_operand(node["right"], consequence)
+            return "boolean"
+
+        return "boolean"
+
+    def _infer_function_call(self, node) -> XFType:
+        name: str = node["name"]
+        arguments: list[AnyASTNode] = node["arguments"]
+        argument_types = [self.result.type_of(argument) for argument in arguments]
+
+        signature = FUNCTION_SIGNATURES.get(name)
+        if signature is None:
+            return "any"
+
+        arity = len(arguments)
+        max_args = signature["max_args"]
+        if arity < signature["min_args"] or (max_args is not None and arity > max_args):
+            if max_args is None:
+                expected = f"at least {signature['min_args']}"
+            elif max_args == signature["min_args"]:
+                expected = str(max_args)
+            else:
+                expected = f"{signature['min_args']} to {max_args}"
+            self.report(
+                node,
+                f"{name}() takes {expected} argument(s) but {arity} were given",
+            )
+
+        for position in signature["nodeset_args"]:
+            if position >= arity:
+                continue
+            argument = arguments[position]
+            if (
+                argument["type"] not in _REFERENCE_NODE_TYPES
+                and argument_types[position] not in ("nodeset", "any")
+            ):
+                self.report(
+                    argument,
+                    f"Argument {position + 1} of {name}() must be a node-set, got {argument_types[position]}",
+                )
+
+        if name == "if" and arity == 3:
+            return _unify(argument_types[1], argument_types[2])
+        if name == "coalesce" and arity == 2:
+            return _unify(argument_types[0], argument_types[1])
+
+        return signature["returns"]
+
+
+def _unify(first: XFType, second: XFType) -> XFType:
+    return first if first == second else "any"
+
+
+def infer_types(
+    ast: ExpressionAST,
+    field_types: Mapping[str, str] | None = None,
+    current_type: str = "any",
+) -> InferredTypes:
+    """
+    Infers the XPath type of every node of an AST.
+
+    `field_types` optionally maps question names to their survey sheet type
+    (e.g. {"age": "integer", "district": "select_one districts"}) or directly to
+    an XFType. `current_type` is the type of `.`, i.e. the question the
+    expression is attached to.
+    """
+    normalized_field_types: dict[str, XFType] = {
+        name: xlsform_type_to_xf_type(field_type)
+        for name, field_type in (field_types or {}).items()
+    }
+    result = InferredTypes(ast)
+    inferrer = _TypeInferrer(
+        result, normalized_field_types, xlsform_type_to_xf_type(current_type)
+    )
+    inferrer.infer(ast)
+    return result
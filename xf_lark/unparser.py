@@ -0,0 +1,180 @@
+import math
+import re
+
+from .ast_nodes import AnyASTNode, ExpressionAST
+from .parser import XFParser
+
+# Binding strength of each operator, mirroring the rule nesting in grammar.lark
+_PRECEDENCE: dict[str, int] = {
+    "or": 1,
+    "and": 2,
+    "eq": 3,
+    "ne": 3,
+    "lt": 3,
+    "gt": 3,
+    "lte": 3,
+    "gte": 3,
+    "add": 4,
+    "subtract": 4,
+    "multiply": 5,
+    "divide": 5,
+    "modulus": 5,
+}
+_UNARY_PRECEDENCE = 6
+_ATOM_PRECEDENCE = 7
+_COMPARISON_PRECEDENCE = 3
+
+_OPERATOR_TOKENS: dict[str, str] = {
+    "or": "or",
+    "and": "and",
+    "eq": "=",
+    "ne": "!=",
+    "lt": "<",
+    "gt": ">",
+    "lte": "<=",
+    "gte": ">=",
+    "add": "+",
+    "subtract": "-",
+    "multiply": "*",
+    "divide": "div",
+    "modulus": "mod",
+}
+
+_KEYWORDS = frozenset(["and", "or", "div", "mod"])
+# The exponent's "+" sign and leading zeros, e.g. in repr(1e20) == "1e+20"
+_EXPONENT_PADDING = re.compile(r"e\+?(-?)0*(?=\d)")
+_NAME_PATTERN = re.compile(r"[_A-Za-z][A-Za-z0-9_-]*")
+_VARIABLE_NAME_PATTERN = re.compile(r"[_A-Za-z][A-Za-z0-9_.-]*")
+
+
+def _precedence(node: AnyASTNode) -> int:
+    if node["type"] == "binary_op":
+        return _PRECEDENCE[node["operator"]]
+    if node["type"] == "unary_op":
+        return _UNARY_PRECEDENCE
+    return _ATOM_PRECEDENCE
+
+
+def format_number_literal(value: float) -> str:
+    """The shortest spelling of a number that parses back to the same float."""
+    if math.isnan(value) or math.isinf(value) or value < 0:
+        raise ValueError(f"Number literal cannot be written in an expression: {value!r}")
+    candidates = [repr(float(value))]
+    if float(value).is_integer():
+        candidates.append(str(int(value)))
+    candidates.extend(
+        _EXPONENT_PADDING.sub(r"e\1", candidate)
+        for candidate in list(candidates)
+        if "e" in candidate
+    )
+    candidates.extend(
+        candidate[1:] for candidate in list(candidates) if candidate.startswith("0.")
+    )
+    return min(
+        (candidate for candidate in candidates if float(candidate) == value),
+        key=len,
+    )
+
+
+def format_string_literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise ValueError(
+        f"String literal cannot contain both quote characters: {value!r}"
+    )
+
+
+def _name(name: str, pattern: re.Pattern[str]) -> str:
+    if not pattern.fullmatch(name) or name in _KEYWORDS:
+        raise ValueError(f"Invalid name in expression: {name!r}")
+    return name
+
+
+def _needs_space(previous: str, following: str) -> bool:
+    if previous in _KEYWORDS or following in _KEYWORDS:
+        return True
+    # `a-1` would lex as the single name "a-1"
+    return following.startswith("-") and _NAME_PATTERN.fullmatch(previous) is not None
+
+
+def unparse(ast: ExpressionAST) -> str:
+    """
+    Writes an AST back as its canonical, minimal expression string: no
+    redundant parentheses or whitespace, single quotes unless the string
+    contains one, and the shortest spelling of each number.
+    `parser.parse(unparse(ast)) == ast` for every AST the parser produces.
+    """
+    tokens: list[str] = []
+    # Items are AST nodes still to be written, or tokens to emit as they are
+    stack: list[AnyASTNode | str] = [ast]
+
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            tokens.append(item)
+            continue
+
+        node = item
+        node_type = node["type"]
+
+        if node_type == "number_literal":
+            tokens.append(format_number_literal(node["value"]))
+        elif node_type == "string_literal":
+            tokens.append(format_string_literal(node["value"]))
+        elif node_type == "variable_ref":
+            tokens.append("${" + _name(node["name"], _VARIABLE_NAME_PATTERN) + "}")
+        elif node_type == "bare_variable_ref":
+            tokens.append(_name(node["name"], _NAME_PATTERN))
+        elif node_type == "current_ref":
+            tokens.append(".")
+        elif node_type == "parent_ref":
+            tokens.append("..")
+        elif node_type == "unary_op":
+            operand = node["operand"]
+            pieces: list[AnyASTNode | str] = ["-"]
+            if _precedence(operand) < _UNARY_PRECEDENCE:
+                pieces += ["(", operand, ")"]
+            else:
+                pieces.append(operand)
+            stack.extend(reversed(pieces))
+        elif node_type == "binary_op":
+            precedence = _PRECEDENCE[node["operator"]]
+            left, right = node["left"], node["right"]
+            # Comparisons don't chain; other operators associate to the left
+            left_needs_parens = _precedence(left) < precedence or (
+                precedence == _COMPARISON_PRECEDENCE
+                and _precedence(left) == precedence
+            )
+            right_needs_parens = _precedence(right) <= precedence
+            pieces = []
+            pieces += ["(", left, ")"] if left_needs_parens else [left]
+            pieces.append(_OPERATOR_TOKENS[node["operator"]])
+            pieces += ["(", right, ")"] if right_needs_parens else [right]
+            stack.extend(reversed(pieces))
+        elif node_type == "function_call":
+            pieces = [_name(node["name"], _NAME_PATTERN), "("]
+            for i, argument in enumerate(node["arguments"]):
+                if i:
+                    pieces.append(",")
+                pieces.append(argument)
+            pieces.append(")")
+            stack.extend(reversed(pieces))
+        else:
+            raise ValueError(f"Cannot unparse node of type {node_type!r}")
+
+    output: list[str] = []
+    for i, token in enumerate(tokens):
+        if i and _needs_space(tokens[i - 1], token):
+            output.append(" ")
+        output.append(token)
+    return "".join(output)
+
+
+def canonicalize(expression: str, parser: XFParser | None = None) -> str:
+    """
+    The canonical form of an expression, e.g. for cache keys: `${a}+1` and
+    `( ${a} + 1 )` both canonicalize to `${a}+1`.
+    """
+    return unparse((parser or XFParser()).parse(expression))
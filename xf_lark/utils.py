@@ -1,6 +1,8 @@
 from rich.console import Console
 from rich.tree import Tree
 
+from .traversal import CHILD_KEYS
+
 
 def normalize_quotes(text: str) -> str:
     replacements = {"‘": "'", "’": "'", "“": '"', "”": '"'}
@@ -35,14 +37,9 @@ def add_ast_to_rich_tree(branch: Tree, ast_node):
         # For dictionary nodes, create a new branch with a label derived from the node's content
         current_branch = branch.add(format_node_label(ast_node))
 
-        # Iterate over keys that might contain children, like 'left', 'right', 'operand', 'arguments'
-        # Prioritize common structural keys for clearer hierarchy.
-        children_keys = [
-            "operand",
-            "left",
-            "right",
-            "arguments",
-        ]  # Order can matter for display
+        # Keys holding children, like 'left', 'right', 'operand', 'arguments',
+        # come first for a clearer hierarchy.
+        children_keys = CHILD_KEYS.get(ast_node.get("type"), ())
 
         processed_keys = set(
             ["type", "operator", "name", "value"]
@@ -89,7 +86,7 @@ def display_ast_as_tree(ast_dict, title="AST"):
 
     # Process children of the root node, skipping keys already in the root label
     processed_keys_for_root = set(["type", "operator", "name", "value"])
-    children_keys = ["operand", "left", "right", "arguments"]
+    children_keys = CHILD_KEYS.get(ast_dict.get("type"), ())
 
     for key in children_keys:
         if key in ast_dict: